@@ -0,0 +1,87 @@
+import argparse
+import sys
+from typing import Iterable, Iterator, Union
+
+import chess
+import numpy as np
+
+
+BoardLike = Union[chess.Board, str]
+
+# Bitboard planes are ordered white pawn..king, then black pawn..king
+PLANES = [(color, piece_type) for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+
+
+def score_table(ai) -> np.ndarray:
+    """The AI's signed material + position values as a (12, 64) array matching PLANES."""
+    return np.array([ai.piece_square_scores[color][piece_type] for color, piece_type in PLANES], dtype=np.int64)
+
+
+def boards_to_bitboards(boards: Iterable[chess.Board]) -> np.ndarray:
+    """Stack each board's pieces_mask bitboards into an (n, 12) uint64 array."""
+    rows = []
+    for board in boards:
+        # Same values as pieces_mask(piece_type, color) in PLANES order, without 12 method calls
+        piece_masks = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        rows.append([mask & white for mask in piece_masks] + [mask & black for mask in piece_masks])
+    return np.array(rows, dtype=np.uint64).reshape(-1, len(PLANES))
+
+
+def evaluate_bitboards(bitboards: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """White-relative material + position scores of an (n, 12) bitboard array, without the checkmate term."""
+    square_bytes = np.ascontiguousarray(bitboards, dtype='<u8').view(np.uint8)
+    occupancy = np.unpackbits(square_bytes, axis=1, bitorder='little').reshape(len(bitboards), len(PLANES), 64)
+    return np.einsum('nps,ps->n', occupancy, table, dtype=np.int64)
+
+
+def iter_evaluate(boards: Iterable[BoardLike], ai, chunk_size: int = 4096) -> Iterator[np.ndarray]:
+    """Evaluate boards or FENs in chunks, yielding one score array per chunk.
+
+    Scores equal ai.evaluate_position for every position; only chunk_size boards are held
+    in memory at a time.
+    """
+    table = score_table(ai)
+    chunk = []
+    for board in boards:
+        chunk.append(chess.Board(board) if isinstance(board, str) else board)
+        if len(chunk) == chunk_size:
+            yield _evaluate_chunk(chunk, ai, table)
+            chunk = []
+    if chunk:
+        yield _evaluate_chunk(chunk, ai, table)
+
+
+def _evaluate_chunk(chunk: list, ai, table: np.ndarray) -> np.ndarray:
+    scores = evaluate_bitboards(boards_to_bitboards(chunk), table)
+    scores[[not board.turn for board in chunk]] *= -1  # evaluate_position scores for the side to move
+    for index, board in enumerate(chunk):
+        # Only positions in check can be mate, so the legal move generation is rarely needed
+        if board.is_check():
+            scores[index] += ai.checkmate_score(board)
+    return scores
+
+
+def evaluate_batch(boards: Iterable[BoardLike], ai, chunk_size: int = 4096) -> np.ndarray:
+    """Evaluate boards or FENs and return all scores as one int64 array."""
+    chunks = list(iter_evaluate(boards, ai, chunk_size))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+
+def main():
+    """Score FENs read one per line from a file or stdin."""
+    from engine import ChessAI
+
+    parser = argparse.ArgumentParser(description="Batch-evaluate FEN positions")
+    parser.add_argument('fens', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    ai = ChessAI(tt_size_mb=1)
+    fens = (line.strip() for line in args.fens if line.strip())
+    for scores in iter_evaluate(fens, ai, args.chunk_size):
+        sys.stdout.write(''.join(f"{score}\n" for score in scores.tolist()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import ast
+import json
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+import chess
+
+from engine import ChessAI
+
+
+# Openings, middlegames and endgames; positions mostly from the usual engine bench and perft suites
+BENCH_POSITIONS = [
+    # Openings
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 2 3",
+    "r1bqkb1r/pppp1ppp/2n2n2/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "rnbqkb1r/pp1p1ppp/4pn2/2p5/2PP4/2N5/PP2PPPP/R1BQKBNR b KQkq - 0 4",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2",
+    "rnbqkb1r/ppp1pppp/5n2/3p4/3P1B2/5N2/PPP1PPPP/RN1QKB1R b KQkq - 3 3",
+    "rnbqk2r/ppp1bppp/4pn2/3p4/2PP4/2N2N2/PP2PPPP/R1BQKB1R w KQkq - 4 5",
+    "rnbqkb1r/pppppp1p/5np1/8/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 0 3",
+    "rnbqkbnr/ppp2ppp/4p3/3p4/3PP3/8/PPP2PPP/RNBQKBNR w KQkq - 0 3",
+    "rnbqkbnr/pp2pppp/2p5/3p4/3PP3/8/PPP2PPP/RNBQKBNR w KQkq - 0 3",
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/2P2N2/PP1P1PPP/RNBQK2R w KQkq - 1 5",
+    # Middlegames
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8",
+    "r2q1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 10",
+    "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2PP1N2/PP3PPP/RNBQ1RK1 w - - 1 7",
+    "2rq1rk1/pp1bppbp/3p1np1/4n3/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 9 13",
+    "r1b2rk1/2q1b1pp/p2ppn2/1p6/3QP3/1BN1B3/PPP3PP/R4RK1 w - - 0 14",
+    "r2qr1k1/1p1nbppp/p2pbn2/4p3/4P3/1NN1BP2/PPPQ2PP/2KR1B1R w - - 5 12",
+    "rnbqkb1r/pp3ppp/3ppn2/8/3NP3/2N5/PPP2PPP/R1BQKB1R w KQkq - 0 6",
+    "r1bqkb1r/5ppp/p1np1n2/1p2p1B1/4P3/N1N5/PPP2PPP/R2QKB1R w KQkq - 0 9",
+    "3r1rk1/p1q2ppp/1pn1pn2/2b5/2P5/P1N1BN2/1PQ1BPPP/3R1RK1 w - - 0 15",
+    "r1bqr1k1/pp1n1pbp/2pp1np1/4p3/2PPP3/2N1BP2/PP1QN1PP/R3KB1R w KQ - 2 10",
+    "2r2rk1/1bqnbppp/p2ppn2/1p6/3NP3/P1N1BP2/1PPQB1PP/2KR3R w - - 0 14",
+    "r4rk1/pp1qbppp/2npbn2/4p3/4P3/1NN1B3/PPP1BPPP/R2Q1RK1 w - - 6 11",
+    "4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19",
+    "r3r1k1/2p2ppp/p1p1bn2/8/1q2P3/2NPQN2/PPP3PP/R4RK1 b - - 2 15",
+    "r1bbk1nr/pp3p1p/2n5/1N4p1/2Np1B2/8/PPP2PPP/2KR1B1R w kq - 0 13",
+    "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16",
+    "4r1k1/r1q2ppp/ppp2n2/4P3/5Rb1/1N1BQ3/PPP3PP/R5K1 w - - 1 17",
+    "2rqkb1r/ppp2p2/2npb1p1/1N1Nn2p/2P1PP2/8/PP2B1PP/R1BQK2R b KQ - 0 11",
+    "r1bq1r1k/b1p1npp1/p2p3p/1p6/3PP3/1B2NN2/PP3PPP/R2Q1RK1 w - - 1 16",
+    "3r1rk1/p5pp/bpp1pp2/8/q1PP1P2/b3P3/P2NQRPP/1R2B1K1 b - - 6 22",
+    # Endgames
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "8/8/8/8/5kp1/P7/8/1K1N4 w - - 0 1",
+    "8/8/8/5N2/8/p7/8/2NK3k w - - 0 1",
+    "8/8/8/4k3/8/8/3BNK2/8 w - - 0 1",
+    "8/8/1P6/5pr1/8/4R3/7k/2K5 w - - 0 1",
+    "8/2p4P/8/kr6/6R1/8/8/1K6 w - - 0 1",
+    "8/8/3P3k/8/1p6/8/1P6/1K3n2 b - - 0 1",
+    "8/R7/2q5/8/6k1/8/1P5p/K6R w - - 0 124",
+    "6k1/3b3r/1p1p4/p1n2p2/1PPNpP1q/P3Q1p1/1R1RB1P1/5K2 b - - 0 1",
+    "5k2/7R/4P2p/5K2/p1r2P1p/8/8/8 b - - 0 1",
+    "8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4 w - - 0 1",
+    "7k/3p2pp/4q3/8/4Q3/5Kp1/P6b/8 w - - 0 1",
+    "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+
+
+def bench(positions: List[str], depth: int, tt_size_mb: int = 16, options: Optional[Dict[str, object]] = None) -> dict:
+    """Search every position to a fixed depth with a fresh engine, returning the results as a dict.
+
+    Each position gets a new ChessAI with an empty table, killers and history and no time limit,
+    so the node counts depend only on the search itself and their sum is a stable signature.
+    Options are search feature flags set on each ChessAI, e.g. {'pvs': False}.
+    """
+    results = []
+    total_nodes, total_time = 0, 0.0
+    for fen in positions:
+        ai = ChessAI(tt_size_mb=tt_size_mb, max_depth=depth)
+        for name, value in (options or {}).items():
+            if not hasattr(ai, name):
+                raise ValueError(f"ChessAI has no option {name!r}")
+            setattr(ai, name, value)
+        board = chess.Board(fen)
+        iterations = []
+        start = time.perf_counter()
+
+        def record(iteration_depth: int, score: float, pv: list):
+            iterations.append({'depth': iteration_depth, 'time': round(time.perf_counter() - start, 6),
+                               'nodes': ai.nodes, 'score': score})
+
+        ai.on_iteration = record
+        move, _, score = ai.search(board, float('inf'))
+        elapsed = time.perf_counter() - start
+        ai.close()
+
+        total_nodes += ai.nodes
+        total_time += elapsed
+        results.append({
+            'fen': fen, 'depth': depth, 'nodes': ai.nodes, 'time': round(elapsed, 6),
+            'nps': int(ai.nodes / elapsed) if elapsed else 0,
+            'move': move.uci() if move else None, 'score': score,
+            'time_to_depth': iterations,
+        })
+
+    return {
+        'depth': depth,
+        'options': options or {},
+        'positions': len(results),
+        'nodes': total_nodes,
+        'time': round(total_time, 6),
+        'nps': int(total_nodes / total_time) if total_time else 0,
+        'signature': total_nodes,
+        'python': platform.python_version(),
+        'results': results,
+    }
+
+
+def bench_evaluation(positions: List[str], repeat: int = 200) -> dict:
+    """Time ChessAI.evaluate_position over the positions."""
+    ai = ChessAI(tt_size_mb=1)
+    boards = [chess.Board(fen) for fen in positions]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            ai.evaluate_position(board)
+    elapsed = time.perf_counter() - start
+    calls = repeat * len(boards)
+    return {'calls': calls, 'time': round(elapsed, 6), 'evals_per_second': int(calls / elapsed) if elapsed else 0}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the benchmark and print the JSON report, then the signature on stderr."""
+    parser = argparse.ArgumentParser(description="Fixed-depth search benchmark with a node-count signature")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--hash', type=int, default=16, help="transposition table size in MB")
+    parser.add_argument('--positions', help="file of FENs to use instead of the built-in set")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    parser.add_argument('--option', action='append', default=[], metavar='NAME=VALUE',
+                        help="set a search feature flag, e.g. --option pvs=False; may be repeated")
+    args = parser.parse_args(argv)
+    options = {name: ast.literal_eval(value) for name, _, value in (option.partition('=') for option in args.option)}
+
+    positions = BENCH_POSITIONS
+    if args.positions:
+        with open(args.positions) as positions_file:
+            positions = [line.strip() for line in positions_file if line.strip()]
+
+    report = bench(positions, args.depth, args.hash, options)
+    report['evaluation'] = bench_evaluation(positions)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+    print(f"Nodes searched: {report['nodes']}\nNodes/second: {report['nps']}\nSignature: {report['signature']}",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
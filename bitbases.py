@@ -0,0 +1,264 @@
+import argparse
+import mmap
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import chess
+
+
+# Tables index positions as (side to move, strong king, weak king, strong piece square), with the
+# strong side (the one owning the extra piece) normalised to White. Each entry is one byte: 0 for
+# a draw or illegal position, otherwise the distance to mate in plies plus one. When the strong
+# side is to move a non-zero entry is a win, when the weak side is to move it is a loss.
+STRONG, WEAK = 0, 1
+TABLE_SIZE = 2 * 64 * 64 * 64
+ENDINGS = {'KQK': chess.QUEEN, 'KRK': chess.ROOK, 'KPK': chess.PAWN}
+GENERATION_ORDER = ['KQK', 'KRK', 'KPK']  # KPK promotes into the other two
+
+
+def index(side: int, strong_king: int, weak_king: int, piece: int) -> int:
+    return ((side * 64 + strong_king) * 64 + weak_king) * 64 + piece
+
+
+KING_MOVES = [[target for target in chess.SQUARES if chess.square_distance(square, target) == 1]
+              for square in chess.SQUARES]
+ADJACENT = [sum(1 << target for target in targets) | (1 << square) for square, targets in enumerate(KING_MOVES)]
+PAWN_ATTACKS = [int(chess.BB_PAWN_ATTACKS[chess.WHITE][square]) for square in chess.SQUARES]
+
+ROOK_DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _rays(directions: list) -> List[List[List[int]]]:
+    """For each square, the squares in each direction ordered outwards."""
+    rays = []
+    for square in chess.SQUARES:
+        square_rays = []
+        for file_step, rank_step in directions:
+            ray = []
+            file, rank = chess.square_file(square) + file_step, chess.square_rank(square) + rank_step
+            while 0 <= file < 8 and 0 <= rank < 8:
+                ray.append(chess.square(file, rank))
+                file, rank = file + file_step, rank + rank_step
+            square_rays.append(ray)
+        rays.append(square_rays)
+    return rays
+
+
+SLIDER_RAYS = {chess.ROOK: _rays(ROOK_DIRECTIONS), chess.QUEEN: _rays(QUEEN_DIRECTIONS)}
+
+
+def _between_masks(rays: List[List[List[int]]]) -> List[Dict[int, int]]:
+    """For each square, the squares its rays reach mapped to the mask of squares in between."""
+    masks = []
+    for square_rays in rays:
+        reach = {}
+        for ray in square_rays:
+            between = 0
+            for target in ray:
+                reach[target] = between
+                between |= 1 << target
+        masks.append(reach)
+    return masks
+
+
+SLIDER_BETWEEN = {piece_type: _between_masks(rays) for piece_type, rays in SLIDER_RAYS.items()}
+
+
+def piece_attacks(piece_type: int, piece: int, target: int, blockers: int) -> bool:
+    """Whether the strong piece on `piece` attacks `target` with the given blocker mask."""
+    if piece_type == chess.PAWN:
+        return bool(PAWN_ATTACKS[piece] >> target & 1)
+    between = SLIDER_BETWEEN[piece_type][piece].get(target)
+    return between is not None and not between & blockers
+
+
+def is_valid(side: int, strong_king: int, weak_king: int, piece: int, piece_type: int) -> bool:
+    """Whether the position is legal with the given side to move."""
+    if strong_king == weak_king or piece in (strong_king, weak_king):
+        return False
+    if ADJACENT[strong_king] >> weak_king & 1:
+        return False
+    if piece_type == chess.PAWN and not 8 <= piece < 56:
+        return False
+    # The weak king may not be in check with the strong side to move
+    return side == WEAK or not piece_attacks(piece_type, piece, weak_king, 1 << strong_king)
+
+
+def generate(piece_type: int, promotions: Optional[Dict[int, bytearray]] = None) -> bytearray:
+    """Solve one three-piece ending by retrograde analysis, returning the packed table."""
+    table = bytearray(TABLE_SIZE)
+    remaining = {}  # Weak-to-move positions: legal replies not yet known to lose
+    frontier: Dict[int, List[int]] = {}  # Distance in plies -> newly decided positions
+
+    for strong_king in chess.SQUARES:
+        for weak_king in chess.SQUARES:
+            for piece in chess.SQUARES:
+                if not is_valid(WEAK, strong_king, weak_king, piece, piece_type):
+                    continue
+                replies, can_capture = 0, False
+                for target in KING_MOVES[weak_king]:
+                    if target == strong_king or ADJACENT[strong_king] >> target & 1:
+                        continue
+                    if target == piece:
+                        can_capture = True  # The piece is undefended, taking it draws
+                        break
+                    if not piece_attacks(piece_type, piece, target, 1 << strong_king):
+                        replies += 1
+                if can_capture:
+                    continue
+                if replies:
+                    remaining[index(WEAK, strong_king, weak_king, piece)] = replies
+                elif piece_attacks(piece_type, piece, weak_king, 1 << strong_king):
+                    frontier.setdefault(0, []).append(index(WEAK, strong_king, weak_king, piece))
+
+    if piece_type == chess.PAWN and promotions:
+        # Promotions leave this table, so seed those wins from the finished queen and rook tables
+        for piece in range(48, 56):
+            for strong_king in chess.SQUARES:
+                for weak_king in chess.SQUARES:
+                    promotion_square = piece + 8
+                    if (promotion_square in (strong_king, weak_king)
+                            or not is_valid(STRONG, strong_king, weak_king, piece, piece_type)):
+                        continue
+                    for promoted in promotions.values():
+                        value = promoted[index(WEAK, strong_king, weak_king, promotion_square)]
+                        if value:
+                            frontier.setdefault(value, []).append(index(STRONG, strong_king, weak_king, piece))
+
+    distance = 0
+    while frontier:
+        positions = frontier.pop(distance, [])
+        for position in positions:
+            if table[position]:
+                continue
+            side, rest = divmod(position, 64 * 64 * 64)
+            strong_king, rest = divmod(rest, 64 * 64)
+            weak_king, piece = divmod(rest, 64)
+            if side == STRONG:
+                table[position] = distance + 1
+                _weak_unmoves(table, remaining, frontier, distance + 1, strong_king, weak_king, piece)
+            else:
+                table[position] = distance + 1
+                _strong_unmoves(table, frontier, distance + 1, strong_king, weak_king, piece, piece_type)
+        distance += 1
+    return table
+
+
+def _strong_unmoves(table: bytearray, frontier: dict, distance: int, strong_king: int, weak_king: int,
+                    piece: int, piece_type: int):
+    """Every position the strong side could have moved from into this lost one is won."""
+    occupied = (1 << strong_king) | (1 << weak_king) | (1 << piece)
+    for origin in KING_MOVES[strong_king]:
+        if not occupied >> origin & 1 and not ADJACENT[weak_king] >> origin & 1:
+            if is_valid(STRONG, origin, weak_king, piece, piece_type):
+                frontier.setdefault(distance, []).append(index(STRONG, origin, weak_king, piece))
+
+    if piece_type == chess.PAWN:
+        origins = []
+        if piece - 8 >= 8 and not occupied >> (piece - 8) & 1:
+            origins.append(piece - 8)
+            if 24 <= piece < 32 and not occupied >> (piece - 16) & 1:
+                origins.append(piece - 16)
+    else:
+        origins = []
+        for ray in SLIDER_RAYS[piece_type][piece]:
+            for origin in ray:
+                if occupied >> origin & 1:
+                    break
+                origins.append(origin)
+    for origin in origins:
+        if is_valid(STRONG, strong_king, weak_king, origin, piece_type):
+            frontier.setdefault(distance, []).append(index(STRONG, strong_king, weak_king, origin))
+
+
+def _weak_unmoves(table: bytearray, remaining: dict, frontier: dict, distance: int, strong_king: int,
+                  weak_king: int, piece: int):
+    """A weak-to-move position is lost once every one of its replies is known to lose."""
+    for origin in KING_MOVES[weak_king]:
+        if origin in (strong_king, piece) or ADJACENT[strong_king] >> origin & 1:
+            continue
+        position = index(WEAK, strong_king, origin, piece)
+        replies = remaining.get(position)
+        if replies is None:
+            continue
+        if replies == 1:
+            del remaining[position]
+            frontier.setdefault(distance, []).append(position)
+        else:
+            remaining[position] = replies - 1
+
+
+class Bitbases:
+    """Memory-mapped three-piece endgame tables probed by the search."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._files = {}
+        self._maps: Dict[int, mmap.mmap] = {}
+        for name, piece_type in ENDINGS.items():
+            path = os.path.join(directory, f"{name}.bin")
+            if os.path.exists(path) and os.path.getsize(path) == TABLE_SIZE:
+                self._files[piece_type] = open(path, 'rb')
+                self._maps[piece_type] = mmap.mmap(self._files[piece_type].fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __bool__(self) -> bool:
+        return bool(self._maps)
+
+    def close(self):
+        """Unmap and close every table."""
+        for table in self._maps.values():
+            table.close()
+        for table_file in self._files.values():
+            table_file.close()
+        self._maps, self._files = {}, {}
+
+    def probe(self, board: chess.Board) -> Optional[Tuple[int, int]]:
+        """Return (result, plies to mate) for the side to move, result being 1 win, 0 draw, -1 loss.
+
+        None means no loaded table covers the position.
+        """
+        if chess.popcount(board.occupied) != 3:
+            return None
+        for piece_type, table in self._maps.items():
+            pieces = board.pieces_mask(piece_type, chess.WHITE) | board.pieces_mask(piece_type, chess.BLACK)
+            if pieces:
+                break
+        else:
+            return None
+
+        piece = chess.lsb(pieces)
+        strong = board.color_at(piece)
+        flip = 0 if strong == chess.WHITE else 56  # Mirror so the strong side plays up the board
+        strong_king = board.king(strong) ^ flip
+        weak_king = board.king(not strong) ^ flip
+        side = STRONG if board.turn == strong else WEAK
+        value = table[index(side, strong_king, weak_king, piece ^ flip)]
+        if not value:
+            return 0, 0
+        return (1 if side == STRONG else -1), value - 1
+
+
+def main():
+    """Generate the bitbase files."""
+    parser = argparse.ArgumentParser(description="Generate KQK, KRK and KPK endgame bitbases")
+    parser.add_argument('--dir', default='bitbases', help="output directory")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    tables = {}
+    for name in GENERATION_ORDER:
+        start = time.perf_counter()
+        promotions = {piece_type: tables[other] for other, piece_type in ENDINGS.items()
+                      if other in tables} if name == 'KPK' else None
+        tables[name] = generate(ENDINGS[name], promotions)
+        with open(os.path.join(args.dir, f"{name}.bin"), 'wb') as table_file:
+            table_file.write(tables[name])
+        decided = sum(1 for value in tables[name] if value)
+        print(f"{name}: {decided} decisive positions, longest mate {max(tables[name]) - 1} plies, "
+              f"{time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
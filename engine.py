@@ -0,0 +1,536 @@
+import os
+import random
+import threading
+import time
+from typing import Optional, Tuple
+
+import chess
+import chess.polyglot
+
+from bitbases import Bitbases
+from lazy_smp import LazySMP
+from move_ordering import MoveOrderer
+from opening_book import OpeningBook
+from position import Position
+from search_stats import IterationStats, SearchResult, SearchStats, append_jsonl
+from transposition_table import Bound, TranspositionTable
+
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 20000
+}
+
+# Indexed by square from White's side (a1 first); Black's pieces use the mirrored square
+POSITION_WEIGHTS = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        0, 0, 0, 0, 0, 0, 0, 0
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50
+    ]
+}
+
+
+def _build_piece_square_scores() -> list:
+    """Signed material + position value of each piece on each square, positive for White."""
+    scores = [[[0] * 64 for _ in range(7)] for _ in chess.COLORS]  # [color][piece_type][square]
+    for color in chess.COLORS:
+        sign = 1 if color == chess.WHITE else -1
+        for piece_type, value in PIECE_VALUES.items():
+            weights = POSITION_WEIGHTS.get(piece_type)
+            for square in chess.SQUARES:
+                square_value = value
+                if weights:
+                    square_value += weights[square if color == chess.WHITE else chess.square_mirror(square)]
+                scores[color][piece_type][square] = sign * square_value
+    return scores
+
+
+PIECE_SQUARE_SCORES = _build_piece_square_scores()
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time budget runs out or the search is stopped."""
+
+
+class ChessAI:
+    """Chess AI using iterative deepening negamax under a time budget.
+
+    Scores are from the point of view of the side to move, so the same search plays either colour.
+    """
+
+    PIECE_VALUES = PIECE_VALUES
+    POSITION_WEIGHTS = POSITION_WEIGHTS
+    QUIESCENCE_DEPTH = 8  # Cap on capture plies searched past the horizon
+    BITBASE_WIN = 19000  # Below a mate the search sees itself, above any material score
+    MATE = 20000  # Mated at the root; a mate n plies away scores MATE - n, so shorter mates score higher
+    MATE_BOUND = BITBASE_WIN - 500  # Scores past this count plies to a win, stored in the TT relative to the node
+    DRAW = 0
+    ASPIRATION_WINDOW = 50  # Half-width of the first aspiration window, quadrupled on each fail
+    ASPIRATION_LIMIT = 1000  # Past this half-width the failing side of the window is opened fully
+    NULL_MOVE_REDUCTION = 2  # Extra plies the null-move search is reduced by, one more from depth 7
+    LMR_MOVE_COUNT = 3  # Quiet moves ordered after this many are searched one ply shallower first
+    FUTILITY_MARGINS = {1: 200, 2: 500}  # By remaining depth: quiet moves can't lift a hopeless score
+    RAZOR_MARGINS = {1: 300, 2: 550}  # By remaining depth: hopeless positions drop into quiescence
+    EXTENSION_DIVISOR = 2  # Extension plies along one line are capped at the iteration depth over this
+
+    def __init__(self, tt_size_mb: int = 16, time_limit: float = 2.0, max_depth: int = 64, debug: bool = False,
+                 threads: int = 1, book_path: Optional[str] = None, book_depth: int = 16, book_weighted: bool = True,
+                 bitbase_dir: Optional[str] = None, collect_stats: bool = False, stats_log: Optional[str] = None):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.debug = debug  # Cross-check the incremental score against a full recompute on every move
+        self.threads = threads  # More than one searches with Lazy SMP helper processes
+        self.book = OpeningBook(book_path) if book_path and os.path.exists(book_path) else None
+        self.book_depth = book_depth  # Plies from the start of the game the book is consulted for
+        self.book_weighted = book_weighted  # Weighted random book moves, otherwise always the heaviest
+        self._rng = random.Random()
+        self.bitbases = Bitbases(bitbase_dir) if bitbase_dir else None
+        self.tt = TranspositionTable(tt_size_mb, shared=threads > 1)
+        self._smp: Optional[LazySMP] = None
+        self.move_orderer = MoveOrderer()
+        self.nodes = 0
+        self.piece_square_scores = PIECE_SQUARE_SCORES
+        self._keys = []  # Zobrist keys of the game since its last irreversible move and of the search line
+        self._pv = []
+        self._root_ply = 0
+        self._deadline: Optional[float] = None
+        self._stop: Optional[threading.Event] = None
+        self.on_iteration = None  # Called with (depth, score, pv) after each completed iteration
+        self.collect_stats = collect_stats or stats_log is not None
+        self.stats_log = stats_log  # JSON-lines file every searched move is appended to
+        self.last_result: Optional[SearchResult] = None
+        self._stats: Optional[SearchStats] = None
+        self.pvs = True  # Null-window scouts for all but the first move, re-searched on fail-high
+        self.aspiration = True  # Start each iteration from a window around the previous score
+        # Selective search, each switchable to measure what it gains
+        self.null_move = True  # Give the opponent a free move; still failing high proves a cutoff
+        self.lmr = True  # Late move reductions for quiet, late-ordered moves
+        self.futility = True  # Skip quiet moves near the leaves when the static score is far below alpha
+        self.razoring = True  # Resolve positions far below alpha near the leaves by quiescence alone
+        self.extensions = True  # Search checks, PV recaptures and pawns reaching the 7th one ply deeper
+        self._root_depth = 0
+        self._extended = 0  # Plies of extension on the line being searched
+
+    def evaluate_position(self, board: chess.Board) -> float:
+        """Evaluate the current board position from the side to move's point of view."""
+        material = self.material_score(board)
+        return self.checkmate_score(board) + (material if board.turn == chess.WHITE else -material)
+
+    def checkmate_score(self, board: chess.Board) -> int:
+        """Penalty for the side to move when it is checkmated, 0 otherwise."""
+        return -self.MATE if board.is_checkmate() else 0
+
+    def material_score(self, board: chess.Board) -> int:
+        """Material and piece-square score recomputed from scratch, positive when White is ahead."""
+        score = 0
+        for square, piece in board.piece_map().items():
+            score += self.piece_square_scores[piece.color][piece.piece_type][square]
+        return score
+
+    def _static_score(self, board: Position) -> int:
+        """The running material score from the side to move's point of view."""
+        return board.score if board.turn == chess.WHITE else -board.score
+
+    def negamax(self, board: Position, depth: int, alpha: float, beta: float) -> Tuple[float, Optional[chess.Move]]:
+        """Alpha-beta negamax returning the score for the side to move and its best move."""
+        ply = len(board.move_stack) - self._root_ply
+        if ply and self._is_draw(board):
+            return self.DRAW, None
+        if ply and self.bitbases and chess.popcount(board.occupied) == 3:
+            probe = self.bitbases.probe(board)
+            if probe is not None:
+                return self._bitbase_score(probe, ply), None
+
+        if depth == 0:
+            return self.quiescence(board, alpha, beta), None
+
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self._should_stop():
+            raise SearchAborted()
+
+        key = self._keys[-1]
+        alpha_orig = alpha
+        entry = self.tt.probe(key)
+        stats = self._stats
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        hash_move = None
+        if entry is not None:
+            hash_move = entry.move
+            if entry.depth >= depth:
+                score = self._score_from_tt(entry.score, ply)
+                if entry.bound == Bound.EXACT:
+                    return score, hash_move
+                if entry.bound == Bound.LOWER and score >= beta:
+                    return score, hash_move
+                if entry.bound == Bound.UPPER and score <= alpha:
+                    return score, hash_move
+
+        in_check = board.is_check()
+        pv_node = beta - alpha > 1
+        static_eval = self._static_score(board)
+        # Prune only in quiet null-window nodes whose window is clear of mate scores
+        prunable = not pv_node and not in_check and abs(beta) < self.MATE_BOUND
+
+        if prunable and self.razoring and depth in self.RAZOR_MARGINS and \
+                static_eval + self.RAZOR_MARGINS[depth] < alpha:
+            eval = self.quiescence(board, alpha, beta)
+            if depth == 1 or eval <= alpha:
+                return eval, None
+
+        if (prunable and self.null_move and depth >= 3 and ply and static_eval >= beta and board.move_stack[-1]
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings)):
+            # Not with only king and pawns, where passing may be the best move (zugzwang)
+            reduction = self.NULL_MOVE_REDUCTION + (depth >= 7)
+            self._push_null(board)
+            eval = -self.negamax(board, max(depth - 1 - reduction, 0), -beta, -beta + 1)[0]
+            self._pop(board)
+            if eval >= beta:
+                return beta, None
+
+        futility_margin = self.FUTILITY_MARGINS.get(depth) if prunable and self.futility else None
+        futile = futility_margin is not None and static_eval + futility_margin <= alpha
+
+        can_extend = self.extensions and self._extended * self.EXTENSION_DIVISOR < self._root_depth
+        # Only the principal variation extends recaptures; everywhere they would double most exchanges
+        recapture_square = board.last_capture_square() if can_extend and pv_node else None
+        seventh_rank = chess.BB_RANK_7 if board.turn == chess.WHITE else chess.BB_RANK_2
+
+        best_eval, best_move = float('-inf'), None
+        for index, move in enumerate(self.move_orderer.staged(board, ply, (self._pv_move(board), hash_move))):
+            quiet = not move.promotion and not board.is_capture(move)
+            gives_check = board.gives_check(move)
+            extension = 0
+            if can_extend and (gives_check or move.to_square == recapture_square and not board.is_losing_capture(move)
+                               or board.piece_type_at(move.from_square) == chess.PAWN
+                               and chess.BB_SQUARES[move.to_square] & seventh_rank):
+                extension = 1
+            if futile and quiet and best_move is not None and not gives_check and not extension:
+                best_eval = max(best_eval, static_eval + futility_margin)
+                continue
+            reduction = 0
+            if (self.lmr and quiet and index >= self.LMR_MOVE_COUNT and depth >= 3 and not in_check
+                    and not gives_check and not extension):
+                reduction = 1 + (index >= 2 * self.LMR_MOVE_COUNT and depth >= 6)
+
+            new_depth = depth - 1 + extension
+            self._extended += extension
+            if extension and stats is not None:
+                stats.extensions += 1
+            self._push(board, move)
+            if reduction:
+                # A reduced scout that fails to beat alpha settles the move, otherwise it is searched normally
+                eval = -self.negamax(board, new_depth - reduction, -alpha - 1, -alpha)[0]
+            if not reduction or eval > alpha:
+                if best_move is None or not self.pvs:
+                    eval = -self.negamax(board, new_depth, -beta, -alpha)[0]
+                else:
+                    # Prove the move is no better than the best so far, searching it fully only if it is
+                    eval = -self.negamax(board, new_depth, -alpha - 1, -alpha)[0]
+                    if alpha < eval < beta:
+                        eval = -self.negamax(board, new_depth, -beta, -alpha)[0]
+            self._pop(board)
+            self._extended -= extension
+
+            if eval > best_eval:
+                best_eval = eval
+                best_move = move
+            alpha = max(alpha, eval)
+            if alpha >= beta:
+                self.move_orderer.record_cutoff(board, move, ply, depth)
+                if stats is not None:
+                    stats.beta_cutoffs += 1
+                    stats.first_move_cutoffs += index == 0
+                break
+
+        if best_move is None:
+            # The first move is always searched, so this is the one place mate and stalemate are found
+            return (ply - self.MATE if in_check else self.DRAW), None
+
+        if best_eval <= alpha_orig:
+            bound = Bound.UPPER
+        elif best_eval >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.tt.store(key, depth, self._score_to_tt(best_eval, ply), bound, best_move)
+        return best_eval, best_move
+
+    def _is_draw(self, board: Position) -> bool:
+        """Fifty-move rule, bare kings or a single minor piece, or a repetition since the last irreversible move.
+
+        Any repetition counts: if the position could be repeated once it can be repeated three times.
+        Checkmate takes priority over the fifty-move rule, so a mated side is never scored as drawn.
+        """
+        if board.halfmove_clock >= 100:
+            return not board.is_check() or bool(board.generate_legal_moves())
+        if chess.popcount(board.occupied) <= 3 and not board.pawns | board.rooks | board.queens:
+            return True
+        keys = self._keys
+        key = keys[-1]
+        oldest = max(len(keys) - 1 - board.halfmove_clock, 0)
+        for index in range(len(keys) - 5, oldest - 1, -2):
+            if keys[index] == key:
+                return True
+        return False
+
+    def _score_to_tt(self, score: float, ply: int) -> float:
+        """Make a mate score count plies from this node rather than from the root before storing it."""
+        if score >= self.MATE_BOUND:
+            return score + ply
+        if score <= -self.MATE_BOUND:
+            return score - ply
+        return score
+
+    def _score_from_tt(self, score: float, ply: int) -> float:
+        """Inverse of _score_to_tt for an entry probed at this ply."""
+        if score >= self.MATE_BOUND:
+            return score - ply
+        if score <= -self.MATE_BOUND:
+            return score + ply
+        return score
+
+    def _bitbase_score(self, probe: Tuple[int, int], ply: int = 0) -> float:
+        """Score a bitbase result, preferring the shortest mate and the longest defence."""
+        result, plies = probe
+        return result * (self.BITBASE_WIN - ply - plies)
+
+    def quiescence(self, board: Position, alpha: float, beta: float, qdepth: int = 0) -> float:
+        """Search captures and promotions past the horizon until the position is quiet."""
+        self.nodes += 1
+        if self._stats is not None:
+            self._stats.qnodes += 1
+        if self.nodes & 1023 == 0 and self._should_stop():
+            raise SearchAborted()
+
+        if qdepth < self.QUIESCENCE_DEPTH and board.is_check():
+            # No standing pat in check, every evasion is searched so mates are still seen
+            moves = board.generate_legal_moves()
+            if not moves:
+                return len(board.move_stack) - self._root_ply - self.MATE
+            best_eval = float('-inf')
+            evading = True
+        else:
+            evading = False
+            best_eval = self._static_score(board)
+            if best_eval >= beta:
+                return best_eval
+            alpha = max(alpha, best_eval)
+            if qdepth >= self.QUIESCENCE_DEPTH:
+                return best_eval
+            moves = [move for move in board.generate_legal_captures() if move.promotion in (None, chess.QUEEN)]
+            promoting = board.pawns & board.occupied_co[board.turn] & (chess.BB_RANK_7 if board.turn else chess.BB_RANK_2)
+            if promoting:
+                pushes = board.generate_legal_moves(promoting, chess.BB_BACKRANKS & ~board.occupied)
+                moves.extend(move for move in pushes if move.promotion == chess.QUEEN)
+
+        ply = len(board.move_stack) - self._root_ply
+        for move in self.move_orderer.order(board, moves, ply):
+            if not evading and board.is_losing_capture(move):
+                continue  # Can't raise alpha if the exchange that follows loses material
+            self._push(board, move)
+            eval = -self.quiescence(board, -beta, -alpha, qdepth + 1)
+            self._pop(board)
+
+            best_eval = max(best_eval, eval)
+            alpha = max(alpha, eval)
+            if alpha >= beta:
+                break
+        return best_eval
+
+    def _push(self, board: Position, move: chess.Move):
+        """Make a move during search, recording the new Zobrist key for repetition detection."""
+        board.push(move)
+        self._keys.append(board.key)
+        if self.debug and board.score != self.material_score(board):
+            raise AssertionError(f"Incremental score {board.score} != {self.material_score(board)} "
+                                 f"after {move} in {board.fen()}")
+
+    def _push_null(self, board: Position):
+        """Pass the turn during search; the material score is unchanged."""
+        board.push(chess.Move.null())
+        self._keys.append(board.key)
+
+    def _pop(self, board: Position):
+        """Unmake the last search move."""
+        board.pop()
+        self._keys.pop()
+
+    def _pv_move(self, board: Position) -> Optional[chess.Move]:
+        """Return the previous iteration's move for this ply if the search is still on its line."""
+        ply = len(board.move_stack) - self._root_ply
+        if ply < len(self._pv) and board.move_stack[self._root_ply:] == self._pv[:ply]:
+            return self._pv[ply]
+        return None
+
+    def _extract_pv(self, board: Position, depth: int) -> list:
+        """Follow best moves through the transposition table to rebuild the principal variation."""
+        pv = []
+        for _ in range(depth):
+            entry = self.tt.probe(self._keys[-1])
+            if entry is None or entry.move is None or not board.is_legal(entry.move):
+                break
+            pv.append(entry.move)
+            self._push(board, entry.move)
+        for _ in pv:
+            self._pop(board)
+        return pv
+
+    @property
+    def principal_variation(self) -> list:
+        """Best line found by the last completed iteration of the most recent search."""
+        return list(self._pv)
+
+    def _should_stop(self) -> bool:
+        """Whether the running search has been stopped or is past its deadline."""
+        if self._stop is not None and self._stop.is_set():
+            return True
+        return self._deadline is not None and time.perf_counter() > self._deadline
+
+    def get_best_move(self, board: chess.Board, time_limit: Optional[float] = None,
+                      stop: Optional[threading.Event] = None, log: bool = True) -> Optional[chess.Move]:
+        """Get the best move for the current position, deepening until the time budget runs out.
+
+        Setting the optional stop event aborts the search from another thread; the move from
+        the last completed iteration is returned, or None if not even depth 1 finished.
+        The full outcome, with statistics when collect_stats is on, is left in last_result and
+        appended to the stats log unless log is False, as for searches whose move may not be played.
+        """
+        start = time.perf_counter()
+        book_move = self._book_move(board)
+        if book_move is not None:
+            self._pv = [book_move]
+            self._stats = None
+            self._finish_result(board, SearchResult(book_move, 0, 0, [book_move], 0, 0.0, book=True), log)
+            return book_move
+
+        if time_limit is None:
+            time_limit = self.time_limit
+        self.tt.new_search()
+        if self.threads > 1:
+            if self._smp is None:
+                self._smp = LazySMP(self, self.threads)
+            best_move, depth, score, self._pv = self._smp.search(board, time_limit, stop)
+        else:
+            best_move, depth, score = self.search(board, time_limit, stop)
+        if self._stats is not None:
+            self._stats.nodes = self.nodes
+        self._finish_result(board, SearchResult(best_move, depth, score, self.principal_variation, self.nodes,
+                                                time.perf_counter() - start, stats=self._stats), log)
+        return best_move
+
+    def _finish_result(self, board: chess.Board, result: SearchResult, log: bool = True):
+        """Keep the result of the last get_best_move and log it if asked to and a stats log is configured."""
+        self.last_result = result
+        if log and self.stats_log:
+            append_jsonl(self.stats_log, board, result)
+
+    def _book_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Opening book move for the position, if the book covers it."""
+        if self.book is None or board.ply() >= self.book_depth:
+            return None
+        return self.book.choose(board, self.book_weighted, self._rng)
+
+    def search(self, board: chess.Board, time_limit: float, stop=None,
+               start_depth: int = 1) -> Tuple[Optional[chess.Move], int, float]:
+        """Iteratively deepen from start_depth, returning (move, depth, score) of the last completed iteration."""
+        start = time.perf_counter()
+        self.move_orderer.new_search()
+        self.nodes = 0
+        self._keys = self._game_keys(board) + [chess.polyglot.zobrist_hash(board)]
+        self._root_ply = len(board.move_stack)
+        position = Position(board, self.piece_square_scores)  # The search runs on this, not on the caller's board
+        self._pv = []
+        self._deadline = None  # The first iteration always completes unless stopped, so there is a move to play
+        self._stop = stop
+        self._stats = SearchStats() if self.collect_stats else None
+        iteration_start, iteration_nodes = start, 0
+
+        best_move, best_depth, best_eval = None, 0, 0
+        for depth in range(start_depth, self.max_depth + 1):
+            self._root_depth, self._extended = depth, 0
+            try:
+                if self.aspiration and best_move is not None and abs(best_eval) < self.MATE_BOUND:
+                    eval, move = self._aspiration_search(position, depth, best_eval)
+                else:
+                    eval, move = self.negamax(position, depth, float('-inf'), float('inf'))
+            except SearchAborted:
+                break  # The position is thrown away, so there is nothing to unwind
+            best_move, best_depth, best_eval = move, depth, eval
+            self._pv = self._extract_pv(position, depth)
+            if self._stats is not None:
+                now = time.perf_counter()
+                self._stats.iterations.append(IterationStats(depth, eval, self.nodes - iteration_nodes,
+                                                             now - iteration_start, [move.uci() for move in self._pv]))
+                iteration_start, iteration_nodes = now, self.nodes
+            if self.on_iteration is not None:
+                self.on_iteration(depth, eval, self.principal_variation)
+            self._deadline = start + time_limit
+            # The next iteration costs several times this one, so don't start what can't finish
+            if time.perf_counter() - start > time_limit / 2 or (stop is not None and stop.is_set()):
+                break
+
+        self._deadline = None
+        self._stop = None
+        return best_move, best_depth, best_eval
+
+    def _game_keys(self, board: chess.Board) -> list:
+        """Zobrist keys of the game positions since the last irreversible move, oldest first.
+
+        They sit below the root on the key stack so the search also sees repetitions of earlier game positions.
+        """
+        keys = []
+        past = board.copy()
+        for _ in range(min(board.halfmove_clock, len(past.move_stack))):
+            past.pop()
+            keys.append(chess.polyglot.zobrist_hash(past))
+        return keys[::-1]
+
+    def _aspiration_search(self, board: Position, depth: int, guess: float) -> Tuple[float, Optional[chess.Move]]:
+        """Search the root in a window around the previous iteration's score, widening it on failure."""
+        delta = self.ASPIRATION_WINDOW
+        alpha, beta = guess - delta, guess + delta
+        while True:
+            eval, move = self.negamax(board, depth, alpha, beta)
+            if eval <= alpha:
+                delta *= 4
+                alpha = guess - delta if delta <= self.ASPIRATION_LIMIT else float('-inf')
+            elif eval >= beta:
+                delta *= 4
+                beta = guess + delta if delta <= self.ASPIRATION_LIMIT else float('inf')
+            else:
+                return eval, move
+
+    def close(self):
+        """Shut down Lazy SMP helpers and release the shared transposition table, book and bitbases."""
+        if self._smp is not None:
+            self._smp.close()
+            self._smp = None
+        self.tt.close()
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.bitbases is not None:
+            self.bitbases.close()
+            self.bitbases = None
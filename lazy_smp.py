@@ -0,0 +1,160 @@
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple
+
+import chess
+
+from bitbases import Bitbases
+from transposition_table import TranspositionTable
+
+
+class SharedFlag:
+    """A one-byte stop flag in shared memory that helper processes poll like a threading.Event."""
+
+    def __init__(self, name: Optional[str] = None):
+        self._owner = name is None
+        if self._owner:
+            self._shm = SharedMemory(create=True, size=1)
+            self._shm.buf[0] = 0
+        else:
+            self._shm = SharedMemory(name=name)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def is_set(self) -> bool:
+        return self._shm.buf[0] == 1
+
+    def set(self):
+        self._shm.buf[0] = 1
+
+    def clear(self):
+        self._shm.buf[0] = 0
+
+    def close(self):
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# ChessAI attributes the helpers copy from the main AI before every search
+SEARCH_OPTIONS = ('max_depth', 'pvs', 'aspiration', 'null_move', 'lmr', 'futility', 'razoring', 'extensions')
+
+# Per-process state of a helper, set up once by the pool initializer
+_helper_ai = None
+_helper_stop: Optional[SharedFlag] = None
+
+
+def search_options(ai) -> dict:
+    """The main AI's search settings, sent to the helpers so they search the same way."""
+    options = {name: getattr(ai, name) for name in SEARCH_OPTIONS}
+    options['bitbase_dir'] = ai.bitbases.directory if ai.bitbases is not None else None
+    return options
+
+
+def _init_helper(ai_class, tt_name: str, tt_size_mb: int, flag_name: str):
+    global _helper_ai, _helper_stop
+    _helper_ai = ai_class(tt_size_mb=1)
+    _helper_ai.tt = TranspositionTable.attach(tt_name, tt_size_mb)
+    _helper_stop = SharedFlag(flag_name)
+
+
+def _apply_options(ai, options: dict):
+    bitbase_dir = options['bitbase_dir']
+    if (ai.bitbases.directory if ai.bitbases is not None else None) != bitbase_dir:
+        if ai.bitbases is not None:
+            ai.bitbases.close()
+        ai.bitbases = Bitbases(bitbase_dir) if bitbase_dir else None
+    for name in SEARCH_OPTIONS:
+        setattr(ai, name, options[name])
+
+
+def _helper_search(board: chess.Board, time_limit: float, start_depth: int, age: int,
+                   options: dict) -> Tuple[Optional[chess.Move], int, float, list]:
+    _apply_options(_helper_ai, options)
+    _helper_ai.tt.age = age
+    return (*_helper_ai.search(board, time_limit, _helper_stop, start_depth), _helper_ai.principal_variation)
+
+
+class LazySMP:
+    """Lazy SMP: helper processes search the same root as the main process through a shared table.
+
+    The helpers only contribute by filling the transposition table, which lets the main
+    search cut off sooner. Odd helpers start one ply deeper so the workers spread across
+    depths. When the main search finishes it stops the helpers, and the deepest completed
+    result from any worker is played, with that worker's principal variation. Helpers take the
+    main AI's search settings afresh for every search.
+    """
+
+    def __init__(self, ai, threads: int):
+        if ai.tt.shared_name is None:
+            raise ValueError("Lazy SMP needs a transposition table created with shared=True")
+        self.ai = ai
+        self.helper_count = threads - 1
+        self.stop_flag = SharedFlag()
+        self.pool = ProcessPoolExecutor(
+            self.helper_count, mp_context=multiprocessing.get_context('spawn'), initializer=_init_helper,
+            initargs=(type(ai), ai.tt.shared_name, ai.tt.size_mb, self.stop_flag.name))
+
+    def search(self, board: chess.Board, time_limit: float,
+               stop=None) -> Tuple[Optional[chess.Move], int, float, list]:
+        """Search with all workers and return (move, depth, score, pv) of the deepest completed iteration."""
+        self.stop_flag.clear()
+        options = search_options(self.ai)
+        helpers = [self.pool.submit(_helper_search, board.copy(), time_limit, 1 + (index + 1) % 2, self.ai.tt.age,
+                                    options)
+                   for index in range(self.helper_count)]
+        result = (*self.ai.search(board, time_limit, stop), self.ai.principal_variation)
+        self.stop_flag.set()
+        for helper in helpers:
+            move, depth, score, pv = helper.result()
+            if move is not None and depth > result[1]:
+                result = (move, depth, score, pv)
+        return result
+
+    def close(self):
+        """Stop the helper processes and release the stop flag."""
+        self.stop_flag.set()
+        self.pool.shutdown()
+        self.stop_flag.close()
+
+
+BENCH_POSITIONS = [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 2 3",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b KQkq - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 b - - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b - - 0 1",
+]
+
+
+def main():
+    """Benchmark time-to-depth with 1 to N workers."""
+    from engine import ChessAI
+
+    parser = argparse.ArgumentParser(description="Lazy SMP time-to-depth benchmark")
+    parser.add_argument('--threads', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--hash', type=int, default=64, help="transposition table size in MB")
+    args = parser.parse_args()
+
+    baseline = None
+    for threads in range(1, args.threads + 1):
+        ai = ChessAI(tt_size_mb=args.hash, max_depth=args.depth, threads=threads)
+        ai.get_best_move(chess.Board(), time_limit=1)  # Start the helper processes outside the timing
+        elapsed = 0.0
+        for fen in BENCH_POSITIONS:
+            ai.tt.clear()
+            start = time.perf_counter()
+            ai.get_best_move(chess.Board(fen), time_limit=float('inf'))
+            elapsed += time.perf_counter() - start
+        ai.close()
+        baseline = baseline or elapsed
+        print(f"threads {threads:2d}  time to depth {args.depth}: {elapsed:7.2f}s  speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import chess
+from typing import Iterator, List
+
+
+class MoveOrderer:
+    """Orders moves for alpha-beta: hash/PV move, MVV-LVA captures, promotions, killers, then history."""
+
+    HASH_MOVE = 1_000_000
+    CAPTURE = 100_000
+    PROMOTION = 90_000
+    KILLER = 80_000
+    HISTORY_LIMIT = 50_000
+
+    # Victim value for MVV-LVA, the attacker's piece type breaks ties (lowest attacker first)
+    VICTIM_VALUES = [0, 100, 320, 330, 500, 900, 20000]
+
+    def __init__(self, max_ply: int = 128):
+        self.max_ply = max_ply
+        self.killers = [[None, None] for _ in range(max_ply)]
+        self.history = [[[0] * 64 for _ in range(64)] for _ in chess.COLORS]  # [color][from][to]
+
+    def new_search(self):
+        """Forget killers from the previous search and age the history table."""
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        for color_history in self.history:
+            for row in color_history:
+                for to_square in range(64):
+                    row[to_square] >>= 1
+
+    def score_move(self, board: chess.Board, move: chess.Move, ply: int,
+                   hash_moves: tuple = ()) -> int:
+        """Ordering score of a single move, higher is searched first."""
+        if move in hash_moves:
+            return self.HASH_MOVE - hash_moves.index(move)
+        victim = board.piece_type_at(move.to_square)
+        if victim:
+            return self.CAPTURE + 10 * self.VICTIM_VALUES[victim] - board.piece_type_at(move.from_square)
+        if move.promotion:
+            return self.PROMOTION + move.promotion
+        if move.to_square == board.ep_square and board.is_en_passant(move):
+            return self.CAPTURE + 10 * self.VICTIM_VALUES[chess.PAWN] - chess.PAWN
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move == killers[0]:
+                return self.KILLER + 1
+            if move == killers[1]:
+                return self.KILLER
+        return self.history[board.turn][move.from_square][move.to_square]
+
+    def order(self, board: chess.Board, moves: List[chess.Move], ply: int,
+              hash_moves: tuple = ()) -> List[chess.Move]:
+        """Return the moves sorted best-first."""
+        hash_moves = tuple(move for move in hash_moves if move is not None)
+        return sorted(moves, key=lambda move: self.score_move(board, move, ply, hash_moves), reverse=True)
+
+    def staged(self, board, ply: int, hash_moves: tuple = ()) -> Iterator[chess.Move]:
+        """Yield the legal moves of a search Position best-first, one stage at a time.
+
+        Hash moves are checked for legality and tried before anything is generated, then captures
+        and promotions by MVV-LVA, then legal killers, then the remaining quiet moves by history,
+        and last the captures that lose material by static exchange evaluation. Each stage is only
+        generated once the previous one is used up, so a node that cuts off early never generates
+        or sorts its quiet moves.
+        """
+        tried = []
+        for move in hash_moves:
+            if move is not None and move not in tried and board.is_legal(move):
+                tried.append(move)
+                yield move
+
+        noisy = board.generate_legal_captures()
+        promoting = board.pawns & board.occupied_co[board.turn] & (chess.BB_RANK_7 if board.turn else chess.BB_RANK_2)
+        if promoting:
+            noisy.extend(board.generate_legal_moves(promoting, chess.BB_BACKRANKS & ~board.occupied))
+        losing = []
+        for move in sorted(noisy, key=lambda move: self.score_move(board, move, ply), reverse=True):
+            if move in tried:
+                continue
+            if board.is_losing_capture(move):
+                losing.append(move)
+            else:
+                yield move
+
+        if ply < self.max_ply:
+            for move in self.killers[ply]:
+                if (move is not None and move not in tried and not move.promotion and not board.is_capture(move)
+                        and board.is_legal(move)):
+                    tried.append(move)
+                    yield move
+
+        history = self.history[board.turn]
+        quiets = [move for move in board.generate_legal_quiets() if not move.promotion and move not in tried]
+        yield from sorted(quiets, key=lambda move: history[move.from_square][move.to_square], reverse=True)
+        yield from losing
+
+    def record_cutoff(self, board: chess.Board, move: chess.Move, ply: int, depth: int):
+        """Credit a quiet move that caused a beta cutoff as a killer and in the history table."""
+        if board.is_capture(move) or move.promotion:
+            return
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        history = self.history[board.turn][move.from_square]
+        history[move.to_square] = min(history[move.to_square] + depth * depth, self.HISTORY_LIMIT)
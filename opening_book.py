@@ -0,0 +1,92 @@
+import mmap
+import os
+import random
+import struct
+from typing import List, NamedTuple, Optional
+
+import chess
+import chess.polyglot
+
+
+class BookEntry(NamedTuple):
+    move: chess.Move
+    weight: int
+
+
+class OpeningBook:
+    """Polyglot .bin opening book, memory-mapped and binary-searched by Zobrist key.
+
+    Polyglot books are arrays of 16 byte big-endian records sorted by key, so a lookup
+    touches only the pages the binary search lands on and opening a large book costs
+    nothing up front.
+    """
+
+    ENTRY = struct.Struct('>QHHI')  # key, move, weight, learn
+    KEY = struct.Struct('>Q')
+
+    # Polyglot writes castling as the king capturing its own rook
+    CASTLING = {
+        (chess.E1, chess.H1): chess.G1, (chess.E1, chess.A1): chess.C1,
+        (chess.E8, chess.H8): chess.G8, (chess.E8, chess.A8): chess.C8,
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.count = size // self.ENTRY.size
+
+    def close(self):
+        """Unmap and close the book file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _first_index(self, key: int) -> int:
+        """Index of the first record whose key is not less than key."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.KEY.unpack_from(self._mmap, middle * self.ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _decode_move(self, board: chess.Board, raw: int) -> chess.Move:
+        to_square, from_square, promotion = raw & 63, (raw >> 6) & 63, (raw >> 12) & 7
+        if board.piece_type_at(from_square) == chess.KING and (from_square, to_square) in self.CASTLING:
+            to_square = self.CASTLING[(from_square, to_square)]
+        return chess.Move(from_square, to_square, promotion + 1 if promotion else None)
+
+    def entries(self, board: chess.Board) -> List[BookEntry]:
+        """All legal book moves for the position with their weights."""
+        if self._mmap is None:
+            return []
+        key = chess.polyglot.zobrist_hash(board)
+        found = []
+        index = self._first_index(key)
+        while index < self.count:
+            entry_key, raw_move, weight, _ = self.ENTRY.unpack_from(self._mmap, index * self.ENTRY.size)
+            if entry_key != key:
+                break
+            move = self._decode_move(board, raw_move)
+            if board.is_legal(move):
+                found.append(BookEntry(move, weight))
+            index += 1
+        return found
+
+    def choose(self, board: chess.Board, weighted: bool = True,
+               rng: Optional[random.Random] = None) -> Optional[chess.Move]:
+        """Pick a book move, at random in proportion to weight or else the heaviest."""
+        found = self.entries(board)
+        if not found:
+            return None
+        if not weighted:
+            return max(found, key=lambda entry: entry.weight).move
+        weights = [entry.weight for entry in found]
+        if not any(weights):
+            weights = None
+        return (rng or random).choices([entry.move for entry in found], weights)[0]
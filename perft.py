@@ -0,0 +1,150 @@
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple
+
+import chess
+import chess.polyglot
+
+from engine import ChessAI
+from position import Position
+
+
+class PerftPosition(NamedTuple):
+    name: str
+    fen: str
+    counts: Dict[int, int]  # Known leaf counts by depth
+
+
+# The standard perft positions (chessprogramming.org) with their published counts
+PERFT_SUITE = [
+    PerftPosition('startpos', chess.STARTING_FEN,
+                  {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    PerftPosition('kiwipete', "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                  {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    PerftPosition('position3', "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    PerftPosition('position4', "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    PerftPosition('position5', "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    PerftPosition('position6', "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+]
+
+
+def perft(board: chess.Board, depth: int) -> int:
+    """Count the leaf nodes of the legal move tree to the given depth.
+
+    The last ply is bulk-counted from the legal move list instead of made and unmade.
+    """
+    if depth == 0:
+        return 1
+    if depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for move in board.generate_legal_moves():
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def engine_perft(ai, board: Position, depth: int) -> int:
+    """perft on the search's own Position through ChessAI's make/unmake, which also updates the Zobrist key and score.
+
+    Every leaf is made, as in a search, so this measures the cost the search actually pays per node,
+    and matching the known counts validates Position's move generation against python-chess.
+    """
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in board.generate_legal_moves():
+        ai._push(board, move)
+        nodes += engine_perft(ai, board, depth - 1)
+        ai._pop(board)
+    return nodes
+
+
+def _count(board: chess.Board, depth: int, engine: bool) -> int:
+    if not engine:
+        return perft(board, depth)
+    ai = ChessAI(tt_size_mb=1)
+    ai._keys = [chess.polyglot.zobrist_hash(board)]
+    return engine_perft(ai, Position(board, ai.piece_square_scores), depth)
+
+
+def divide(board: chess.Board, depth: int, engine: bool = False) -> Dict[str, int]:
+    """Leaf counts below each root move, for locating a move generation bug."""
+    counts = {}
+    for move in board.legal_moves:
+        board.push(move)
+        counts[move.uci()] = _count(board, depth - 1, engine)
+        board.pop()
+    return counts
+
+
+def _perft_after(fen: str, move: str, depth: int, engine: bool) -> int:
+    board = chess.Board(fen)
+    board.push_uci(move)
+    return _count(board, depth - 1, engine)
+
+
+def parallel_divide(board: chess.Board, depth: int, workers: int, engine: bool = False) -> Dict[str, int]:
+    """divide() with the root moves split across a process pool."""
+    if depth < 2 or workers < 2:
+        return divide(board, depth, engine)
+    moves = [move.uci() for move in board.legal_moves]
+    count = len(moves)
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        counts = pool.map(_perft_after, [board.fen()] * count, moves, [depth] * count, [engine] * count)
+        return dict(zip(moves, counts))
+
+
+def run_suite(depth: int, workers: int = 1, engine: bool = False,
+              positions: List[PerftPosition] = PERFT_SUITE) -> bool:
+    """Check every position with a known count at each depth up to `depth`, printing nodes per second."""
+    passed = True
+    for position in positions:
+        for position_depth in sorted(position.counts):
+            if position_depth > depth:
+                break
+            start = time.perf_counter()
+            nodes = sum(parallel_divide(chess.Board(position.fen), position_depth, workers, engine).values())
+            elapsed = time.perf_counter() - start
+            expected = position.counts[position_depth]
+            status = 'ok' if nodes == expected else f'FAIL (expected {expected})'
+            passed &= nodes == expected
+            print(f"{position.name:10s} depth {position_depth}  {nodes:10d} nodes  {elapsed:8.3f}s  "
+                  f"{int(nodes / elapsed) if elapsed else 0:9d} nps  {status}", flush=True)
+    return passed
+
+
+def main():
+    """Run the perft suite, or perft/divide on one position."""
+    parser = argparse.ArgumentParser(description="Perft move generation validation and throughput")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fen', help="count this position instead of running the suite")
+    parser.add_argument('--divide', action='store_true', help="print the count below each root move")
+    parser.add_argument('--workers', type=int, default=1, help="processes to split the root moves across")
+    parser.add_argument('--engine', action='store_true',
+                        help="generate and make every move with the search's Position instead of python-chess")
+    args = parser.parse_args()
+
+    if args.fen is None and not args.divide:
+        raise SystemExit(0 if run_suite(args.depth, args.workers, args.engine) else 1)
+
+    board = chess.Board(args.fen or chess.STARTING_FEN)
+    start = time.perf_counter()
+    counts = parallel_divide(board, args.depth, args.workers, args.engine)
+    elapsed = time.perf_counter() - start
+    if args.divide:
+        for move, count in sorted(counts.items()):
+            print(f"{move}: {count}")
+    nodes = sum(counts.values())
+    print(f"Nodes: {nodes}  Time: {elapsed:.3f}s  NPS: {int(nodes / elapsed) if elapsed else 0}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 import pygame
 import chess
 import sys
+import threading
+import time
 from typing import Optional, Tuple
+from engine import ChessAI
+from search_stats import SearchResult, append_jsonl
 
 
 class Colors:
@@ -16,6 +20,11 @@ class Config:
     BOARD_OFFSET = 40
     SQUARE_SIZE = WINDOW_SIZE // 8
     PIECE_SIZE = SQUARE_SIZE - 10
+    FPS = 60
+    PONDER = True  # Let the AI keep searching on the player's time
+    BOOK_PATH = 'book.bin'  # Polyglot opening book, used when the file exists
+    BITBASE_DIR = 'bitbases'  # Endgame tables written by bitbases.py, used when present
+    STATS_LOG = None  # JSON-lines file to log the AI's search statistics for every move, e.g. 'ai_stats.jsonl'
 
 
 class ChessRenderer:
@@ -90,8 +99,8 @@ class ChessRenderer:
             pygame.draw.rect(s, Colors.VALID_MOVE, s.get_rect())
             screen.blit(s, (x, y))
 
-    def draw_status(self, screen: pygame.Surface, board: chess.Board):
-        """Draw game status (current turn or game over message)."""
+    def draw_status(self, screen: pygame.Surface, board: chess.Board, thinking: bool = False):
+        """Draw game status (current turn, AI thinking or game over message)."""
         if board.is_game_over():
             status = "Draw" if board.is_stalemate() else f"{'White' if not board.turn else 'Black'} wins!"
             if board.is_checkmate():
@@ -101,7 +110,8 @@ class ChessRenderer:
             screen.blit(text, text_rect)
         else:
             turn = "White" if board.turn else "Black"
-            text = self.font.render(f"Current turn: {turn}", True, (0, 0, 0))
+            status = f"{turn} (AI) is thinking…" if thinking else f"Current turn: {turn}"
+            text = self.font.render(status, True, (0, 0, 0))
             text_rect = text.get_rect(center=(Config.WINDOW_SIZE // 2, Config.BOARD_OFFSET // 2))
             screen.blit(text, text_rect)
 
@@ -127,117 +137,6 @@ class CoordinateConverter:
         return (col * self.square_size, row * self.square_size)
 
 
-class ChessAI:
-    """Simple chess AI using minimax with depth 3."""
-
-    PIECE_VALUES = {
-        chess.PAWN: 100,
-        chess.KNIGHT: 320,
-        chess.BISHOP: 330,
-        chess.ROOK: 500,
-        chess.QUEEN: 900,
-        chess.KING: 20000
-    }
-
-    POSITION_WEIGHTS = {
-        chess.PAWN: [
-            0,  0,  0,  0,  0,  0,  0,  0,
-            50, 50, 50, 50, 50, 50, 50, 50,
-            10, 10, 20, 30, 30, 20, 10, 10,
-            5,  5, 10, 25, 25, 10,  5,  5,
-            0,  0,  0, 20, 20,  0,  0,  0,
-            5, -5,-10,  0,  0,-10, -5,  5,
-            5, 10, 10,-20,-20, 10, 10,  5,
-            0,  0,  0,  0,  0,  0,  0,  0
-        ],
-        chess.KNIGHT: [
-            -50,-40,-30,-30,-30,-30,-40,-50,
-            -40,-20,  0,  0,  0,  0,-20,-40,
-            -30,  0, 10, 15, 15, 10,  0,-30,
-            -30,  5, 15, 20, 20, 15,  5,-30,
-            -30,  0, 15, 20, 20, 15,  0,-30,
-            -30,  5, 10, 15, 15, 10,  5,-30,
-            -40,-20,  0,  5,  5,  0,-20,-40,
-            -50,-40,-30,-30,-30,-30,-40,-50
-        ]
-    }
-
-    def __init__(self):
-        self.max_depth = 3
-
-    def evaluate_position(self, board: chess.Board) -> float:
-        """Evaluate the current board position."""
-
-        score = 0
-
-        if board.is_checkmate():
-            if board.turn:
-                score = 20000
-            else:
-                score = -20000
-
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is None:
-                continue
-
-            value = self.PIECE_VALUES[piece.piece_type]
-            if piece.piece_type in self.POSITION_WEIGHTS:
-                position_value = self.POSITION_WEIGHTS[piece.piece_type][square if piece.color else chess.square_mirror(square)]
-                value += position_value
-
-            if piece.color != chess.WHITE:
-                score += value
-            else:
-                score -= value
-
-        return score
-
-    def minimax(self, board: chess.Board, depth: int, alpha: float, beta: float, maximizing: bool) -> Tuple[
-        float, Optional[chess.Move]]:
-        """Minimax function that uses recursion to calculate best move"""
-        if depth == 0 or board.is_game_over():
-            return self.evaluate_position(board), None
-
-        best_move = None
-        if maximizing:
-            max_eval = float('-inf')
-            for move in board.legal_moves:
-                board.push(move)
-                eval, _ = self.minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
-
-                if eval > max_eval:
-                    max_eval = eval
-                    best_move = move
-                alpha = max(alpha, eval)
-                if beta <= alpha:
-                    break
-            return max_eval, best_move
-        else:
-            min_eval = float('inf')
-            for move in board.legal_moves:
-                board.push(move)
-                eval, _ = self.minimax(board, depth - 1, alpha, beta, True)
-                board.pop()
-
-                if eval < min_eval:
-                    min_eval = eval
-                    best_move = move
-                beta = min(beta, eval)
-                if beta <= alpha:
-                    break
-            return min_eval, best_move
-
-    def get_best_move(self, board: chess.Board) -> chess.Move:
-        """Get the best move for the current position."""
-        _, best_move = self.minimax(board, self.max_depth, float('-inf'), float('inf'), True)
-        if sum(
-            1 for square in chess.SQUARES if board.piece_at(square) and board.piece_at(square).color == chess.WHITE) <= 3:
-            max_depth = 5
-        return best_move
-
-
 class GameState:
     """Manages the chess game state and move validation."""
 
@@ -245,7 +144,16 @@ class GameState:
         self.board = chess.Board()
         self.selected_square: Optional[chess.Square] = None
         self.valid_moves = []
-        self.ai = ChessAI()
+        self.ai = ChessAI(book_path=Config.BOOK_PATH, bitbase_dir=Config.BITBASE_DIR, stats_log=Config.STATS_LOG)
+        self.ponder = Config.PONDER
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self._ai_thread: Optional[threading.Thread] = None
+        self._ai_stop = threading.Event()
+        self._ai_result: Optional[Tuple[int, Optional[chess.Move], list, Optional[SearchResult]]] = None
+        self._search_id = 0
+        self._search_started = 0.0
+        self._ponder_move: Optional[chess.Move] = None
         self.player_color = chess.WHITE
 
     def handle_click(self, clicked_square: chess.Square):
@@ -273,16 +181,104 @@ class GameState:
                     self.board.push(move)
                     # AI moves after player's move
                     if not self.board.is_game_over():
-                        self.make_ai_move()
+                        self.start_ai_move()
+                    else:
+                        self._stop_pondering()
 
             self.selected_square = None
             self.valid_moves = []
 
-    def make_ai_move(self):
-        """Make AI's move."""
-        ai_move = self.ai.get_best_move(self.board)
-        if ai_move:
+    @property
+    def thinking(self) -> bool:
+        """Whether a background AI search for the AI's own move is in progress."""
+        return self._ai_thread is not None and self._ponder_move is None
+
+    @property
+    def ponder_hit_rate(self) -> float:
+        """Fraction of player moves that matched the move the AI pondered on."""
+        guesses = self.ponder_hits + self.ponder_misses
+        return self.ponder_hits / guesses if guesses else 0.0
+
+    def start_ai_move(self):
+        """Start searching for the AI's move on a background thread."""
+        if self._ponder_move is not None and self.board.move_stack and self.board.peek() == self._ponder_move:
+            self._ponder_hit()
+            return
+        self._stop_pondering()
+        self._start_search(self.board.copy(), self.ai.time_limit)
+
+    def _stop_pondering(self):
+        """Stop any search still running, counting an unresolved ponder search as a miss."""
+        if self._ponder_move is not None:
+            self.ponder_misses += 1
+        self.cancel_ai_move()
+
+    def _ponder_hit(self):
+        """Turn the ponder search into the real search, keeping the time already spent."""
+        self.ponder_hits += 1
+        self._ponder_move = None
+        remaining = self.ai.time_limit - (time.perf_counter() - self._search_started)
+        if remaining <= 0:
+            self._ai_stop.set()  # Already searched for a full move's budget, play instantly
+        else:
+            timer = threading.Timer(remaining, self._ai_stop.set)
+            timer.daemon = True
+            timer.start()
+
+    def _start_pondering(self, pv: list):
+        """Search the position after the player's expected reply while the player thinks."""
+        if not self.ponder or len(pv) < 2 or self.board.is_game_over() or pv[1] not in self.board.legal_moves:
+            return
+        board = self.board.copy()
+        board.push(pv[1])
+        self._start_search(board, float('inf'), ponder_move=pv[1])
+
+    def _start_search(self, board: chess.Board, time_limit: float, ponder_move: Optional[chess.Move] = None):
+        self._search_id += 1
+        self._ai_stop = threading.Event()
+        self._ponder_move = ponder_move
+        self._search_started = time.perf_counter()
+        self._ai_thread = threading.Thread(target=self._run_ai_search,
+                                           args=(board, time_limit, self._ai_stop, self._search_id), daemon=True)
+        self._ai_thread.start()
+
+    def _run_ai_search(self, board: chess.Board, time_limit: float, stop: threading.Event, search_id: int):
+        # Logged only once the move is played, since ponder and cancelled searches never are
+        move = self.ai.get_best_move(board, time_limit, stop, log=False)
+        self._ai_result = (search_id, move, self.ai.principal_variation, self.ai.last_result)
+
+    def poll_ai_move(self):
+        """Play the AI's move once the background search has finished, then start pondering."""
+        if self._ai_thread is None or self._ai_thread.is_alive() or self._ponder_move is not None:
+            return
+        self._ai_thread = None
+        result, self._ai_result = self._ai_result, None
+        if result is None or result[0] != self._search_id:
+            return
+        _, ai_move, pv, search_result = result
+        if ai_move and ai_move in self.board.legal_moves:
+            if self.ai.stats_log and search_result is not None:
+                append_jsonl(self.ai.stats_log, self.board, search_result)
             self.board.push(ai_move)
+            if pv and pv[0] == ai_move:
+                self._start_pondering(pv)
+
+    def cancel_ai_move(self):
+        """Stop a running AI or ponder search and discard its result."""
+        if self._ai_thread is not None:
+            self._ai_stop.set()
+            self._ai_thread.join()
+            self._ai_thread = None
+        self._search_id += 1
+        self._ponder_move = None
+        self._ai_result = None
+
+    def new_game(self):
+        """Cancel any search in progress and reset the board."""
+        self.cancel_ai_move()
+        self.board = chess.Board()
+        self.selected_square = None
+        self.valid_moves = []
 
 
 class ChessGame:
@@ -296,6 +292,7 @@ class ChessGame:
         self.renderer = ChessRenderer(Config.WINDOW_SIZE)
         self.coords_converter = CoordinateConverter(Config.SQUARE_SIZE)
         self.game_state = GameState()
+        self.clock = pygame.time.Clock()
 
     def handle_events(self) -> bool:
         for event in pygame.event.get():
@@ -305,6 +302,9 @@ class ChessGame:
                 if event.button == 1:  # Left click
                     clicked_square = self.coords_converter.coords_to_square(event.pos)
                     self.game_state.handle_click(clicked_square)
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_n:  # New game
+                    self.game_state.new_game()
         return True
 
     def render(self):
@@ -323,15 +323,18 @@ class ChessGame:
                 coords = self.coords_converter.square_to_coords(square)
                 self.renderer.draw_piece(self.screen, piece, coords)
 
-        self.renderer.draw_status(self.screen, self.game_state.board)
+        self.renderer.draw_status(self.screen, self.game_state.board, self.game_state.thinking)
         pygame.display.flip()
 
     def run(self):
         running = True
         while running:
             running = self.handle_events()
+            self.game_state.poll_ai_move()
             self.render()
+            self.clock.tick(Config.FPS)
 
+        self.game_state.cancel_ai_move()
         pygame.quit()
         sys.exit()
 
@@ -0,0 +1,555 @@
+from functools import lru_cache
+from typing import Dict, List
+
+import chess
+import chess.polyglot
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = chess.PIECE_TYPES
+BB_SQUARES = chess.BB_SQUARES
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+PAWN_ATTACKS = chess.BB_PAWN_ATTACKS  # [color][square]: squares a pawn of that colour attacks
+# Sliding attacks, looked up by square and the occupancy masked to the line through it
+DIAG_MASKS, DIAG_ATTACKS = chess.BB_DIAG_MASKS, chess.BB_DIAG_ATTACKS
+FILE_MASKS, FILE_ATTACKS = chess.BB_FILE_MASKS, chess.BB_FILE_ATTACKS
+RANK_MASKS, RANK_ATTACKS = chess.BB_RANK_MASKS, chess.BB_RANK_ATTACKS
+RAYS = chess.BB_RAYS  # [a][b]: the whole line through both squares, 0 if they don't share one
+BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+# One shared Move object per from/to pair, so generating moves doesn't allocate them
+MOVES = [[chess.Move(from_square, to_square) for to_square in chess.SQUARES] for from_square in chess.SQUARES]
+PROMOTION_TYPES = (QUEEN, ROOK, BISHOP, KNIGHT)
+SEE_VALUES = [0, 100, 320, 330, 500, 900, 20000]  # By piece type, as in the evaluation
+SEE_CACHE_SIZE = 1 << 16  # Entries kept before the exchange cache is cleared
+
+ZOBRIST_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+
+# PIECE_KEYS[color][piece_type][square], laid out exactly like the Polyglot hasher
+PIECE_KEYS = [
+    [[0] * 64] + [[ZOBRIST_ARRAY[64 * ((piece_type - 1) * 2 + color) + square] for square in chess.SQUARES]
+                  for piece_type in chess.PIECE_TYPES]
+    for color in (chess.BLACK, chess.WHITE)
+]
+EP_KEYS = [ZOBRIST_ARRAY[772 + file] for file in range(8)]
+TURN_KEY = ZOBRIST_ARRAY[780]
+
+
+@lru_cache(maxsize=None)
+def castling_key(castling_rights: chess.Bitboard) -> int:
+    """Zobrist contribution of a (clean) castling rights mask."""
+    key = 0
+    for offset, square in enumerate((chess.H1, chess.A1, chess.H8, chess.A8)):
+        if castling_rights & chess.BB_SQUARES[square]:
+            key ^= ZOBRIST_ARRAY[768 + offset]
+    return key
+
+
+def ep_key(board: chess.Board) -> int:
+    """Zobrist contribution of the en passant square, hashed only if a pawn can capture."""
+    ep_square = board.ep_square
+    if ep_square is None:
+        return 0
+    if board.turn == chess.WHITE:
+        ep_mask = chess.shift_down(chess.BB_SQUARES[ep_square])
+    else:
+        ep_mask = chess.shift_up(chess.BB_SQUARES[ep_square])
+    ep_mask = chess.shift_left(ep_mask) | chess.shift_right(ep_mask)
+    if ep_mask & board.pawns & board.occupied_co[board.turn]:
+        return EP_KEYS[chess.square_file(ep_square)]
+    return 0
+
+
+class Position:
+    """Search-only position: bitboards and a piece-type mailbox with in-place make/unmake.
+
+    Built from a chess.Board at the root of a search. It answers the part of the chess.Board
+    API the search, move ordering and bitbases use, and keeps the Zobrist key and the
+    White-relative material score up to date as moves are made. Each push saves a small
+    undo record instead of a full board state. Standard chess only.
+    """
+
+    __slots__ = ('squares', 'pieces', 'occupied_co', 'occupied', 'turn', 'castling_rights', 'ep_square',
+                 'halfmove_clock', 'key', 'score', 'move_stack', 'piece_square_scores', '_undo', '_see_cache')
+
+    def __init__(self, board: chess.Board, piece_square_scores: list):
+        self.squares = [board.piece_type_at(square) or 0 for square in chess.SQUARES]
+        self.pieces = [0] + [board.pieces_mask(piece_type, chess.WHITE) | board.pieces_mask(piece_type, chess.BLACK)
+                             for piece_type in chess.PIECE_TYPES]
+        self.occupied_co = list(board.occupied_co)
+        self.occupied = board.occupied
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        # Kept only when a pawn could capture, which is also when the Polyglot key includes it
+        self.ep_square = board.ep_square if ep_key(board) else None
+        self.halfmove_clock = board.halfmove_clock
+        self.key = chess.polyglot.zobrist_hash(board)
+        self.piece_square_scores = piece_square_scores  # [color][piece_type][square], positive for White
+        self.score = sum(piece_square_scores[piece.color][piece.piece_type][square]
+                         for square, piece in board.piece_map().items())
+        self.move_stack = list(board.move_stack)
+        self._undo = []
+        self._see_cache = {}  # (key, from, to, promotion) -> see(), shared by every node of the search
+
+    @property
+    def pawns(self) -> chess.Bitboard:
+        return self.pieces[PAWN]
+
+    @property
+    def knights(self) -> chess.Bitboard:
+        return self.pieces[KNIGHT]
+
+    @property
+    def bishops(self) -> chess.Bitboard:
+        return self.pieces[BISHOP]
+
+    @property
+    def rooks(self) -> chess.Bitboard:
+        return self.pieces[ROOK]
+
+    @property
+    def queens(self) -> chess.Bitboard:
+        return self.pieces[QUEEN]
+
+    @property
+    def kings(self) -> chess.Bitboard:
+        return self.pieces[KING]
+
+    def last_capture_square(self):
+        """Square the previous move captured a piece on, None if it captured nothing."""
+        if self._undo and self._undo[-1][0]:
+            return self.move_stack[-1].to_square
+        return None
+
+    def piece_type_at(self, square: chess.Square) -> int:
+        """Piece type on the square, 0 if it is empty."""
+        return self.squares[square]
+
+    def color_at(self, square: chess.Square):
+        """Colour of the piece on the square, None if it is empty."""
+        if self.occupied_co[chess.WHITE] & BB_SQUARES[square]:
+            return chess.WHITE
+        if self.occupied_co[chess.BLACK] & BB_SQUARES[square]:
+            return chess.BLACK
+        return None
+
+    def pieces_mask(self, piece_type: chess.PieceType, color: chess.Color) -> chess.Bitboard:
+        return self.pieces[piece_type] & self.occupied_co[color]
+
+    def king(self, color: chess.Color) -> chess.Square:
+        return (self.pieces[KING] & self.occupied_co[color]).bit_length() - 1
+
+    def piece_map(self) -> Dict[chess.Square, chess.Piece]:
+        return {square: chess.Piece(piece_type, bool(self.occupied_co[chess.WHITE] & BB_SQUARES[square]))
+                for square, piece_type in enumerate(self.squares) if piece_type}
+
+    def to_board(self) -> chess.Board:
+        """An equivalent chess.Board, without the move history."""
+        board = chess.Board(None)
+        for square, piece in self.piece_map().items():
+            board.set_piece_at(square, piece)
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        return board
+
+    def fen(self) -> str:
+        return self.to_board().fen()
+
+    def attackers(self, color: chess.Color, square: chess.Square, occupied: chess.Bitboard) -> chess.Bitboard:
+        """Pieces of the colour attacking the square, with sliders seeing through everything not in `occupied`."""
+        pieces = self.pieces
+        queens = pieces[QUEEN]
+        return ((KNIGHT_ATTACKS[square] & pieces[KNIGHT])
+                | (KING_ATTACKS[square] & pieces[KING])
+                | (PAWN_ATTACKS[not color][square] & pieces[PAWN])
+                | ((RANK_ATTACKS[square][RANK_MASKS[square] & occupied]
+                    | FILE_ATTACKS[square][FILE_MASKS[square] & occupied]) & (pieces[ROOK] | queens))
+                | (DIAG_ATTACKS[square][DIAG_MASKS[square] & occupied] & (pieces[BISHOP] | queens))
+                ) & self.occupied_co[color] & occupied
+
+    def is_check(self) -> bool:
+        return bool(self.attackers(not self.turn, self.king(self.turn), self.occupied))
+
+    def is_capture(self, move: chess.Move) -> bool:
+        return bool(self.squares[move.to_square]) or self.is_en_passant(move)
+
+    def is_en_passant(self, move: chess.Move) -> bool:
+        return move.to_square == self.ep_square and self.squares[move.from_square] == PAWN
+
+    def gives_check(self, move: chess.Move) -> bool:
+        """Whether the move checks the opponent, worked out from attacks without making it."""
+        from_square, to_square = move.from_square, move.to_square
+        piece = self.squares[from_square]
+        if piece == KING and to_square - from_square in (2, -2):
+            self.push(move)  # Castling, where the rook may give the check
+            try:
+                return self.is_check()
+            finally:
+                self.pop()
+
+        turn = self.turn
+        pieces = self.pieces
+        king = self.king(not turn)
+        occupied = (self.occupied & ~BB_SQUARES[from_square]) | BB_SQUARES[to_square]
+        if piece == PAWN and to_square == self.ep_square:
+            occupied &= ~BB_SQUARES[to_square - 8 if turn else to_square + 8]
+
+        piece = move.promotion or piece
+        king_bb = BB_SQUARES[king]
+        if piece == PAWN:
+            direct = PAWN_ATTACKS[turn][to_square]
+        elif piece == KNIGHT:
+            direct = KNIGHT_ATTACKS[to_square]
+        elif piece == KING:
+            direct = 0
+        else:
+            direct = 0
+            if piece != ROOK:
+                direct |= DIAG_ATTACKS[to_square][DIAG_MASKS[to_square] & occupied]
+            if piece != BISHOP:
+                direct |= (RANK_ATTACKS[to_square][RANK_MASKS[to_square] & occupied]
+                           | FILE_ATTACKS[to_square][FILE_MASKS[to_square] & occupied])
+        if direct & king_bb:
+            return True
+
+        # Discovered check by a slider the moving piece was blocking
+        ours = self.occupied_co[turn] & ~BB_SQUARES[from_square]
+        queens = pieces[QUEEN]
+        return bool((RANK_ATTACKS[king][RANK_MASKS[king] & occupied] | FILE_ATTACKS[king][FILE_MASKS[king] & occupied])
+                    & (pieces[ROOK] | queens) & ours
+                    or DIAG_ATTACKS[king][DIAG_MASKS[king] & occupied] & (pieces[BISHOP] | queens) & ours)
+
+    def see(self, move: chess.Move) -> int:
+        """Static exchange evaluation: material the side to move gains from the move and best play of captures
+        and recaptures on its destination square, each side free to stop when capturing no longer pays.
+
+        Every capture is by the least valuable attacker, including sliders uncovered behind earlier ones.
+        Pins are ignored. Results are cached by position key.
+        """
+        cache_key = (self.key, move.from_square, move.to_square, move.promotion)
+        cached = self._see_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        from_square, to_square = move.from_square, move.to_square
+        squares, pieces = self.squares, self.pieces
+        piece = squares[from_square]
+        occupied = self.occupied & ~BB_SQUARES[from_square]
+        captured = squares[to_square]
+        if piece == PAWN and to_square == self.ep_square:
+            captured = PAWN
+            occupied &= ~BB_SQUARES[to_square - 8 if self.turn else to_square + 8]
+        gains = [SEE_VALUES[captured]]
+        if move.promotion:
+            piece = move.promotion
+            gains[0] += SEE_VALUES[piece] - SEE_VALUES[PAWN]
+
+        side = not self.turn
+        while True:
+            attackers = self.attackers(side, to_square, occupied)
+            if not attackers:
+                break
+            for attacker in chess.PIECE_TYPES:
+                attacker_bb = attackers & pieces[attacker]
+                if attacker_bb:
+                    break
+            gains.append(SEE_VALUES[piece] - gains[-1])  # Gain for this side if the exchange stopped here
+            occupied &= ~(attacker_bb & -attacker_bb)
+            piece = attacker
+            side = not side
+
+        # Back up from the last capture: each side either stops or continues, whichever gains more
+        for index in range(len(gains) - 1, 0, -1):
+            gains[index - 1] = -max(-gains[index - 1], gains[index])
+
+        if len(self._see_cache) >= SEE_CACHE_SIZE:
+            self._see_cache.clear()
+        self._see_cache[cache_key] = gains[0]
+        return gains[0]
+
+    def is_losing_capture(self, move: chess.Move) -> bool:
+        """Whether the move's exchange loses material; only worked out when the mover is worth more than its victim."""
+        if SEE_VALUES[self.squares[move.to_square]] >= SEE_VALUES[self.squares[move.from_square]]:
+            return False
+        return self.see(move) < 0
+
+    def is_legal(self, move: chess.Move) -> bool:
+        return move in self.generate_legal_moves(BB_SQUARES[move.from_square], BB_SQUARES[move.to_square])
+
+    def generate_legal_moves(self, from_mask: chess.Bitboard = chess.BB_ALL,
+                             to_mask: chess.Bitboard = chess.BB_ALL) -> List[chess.Move]:
+        """Legal moves from squares in from_mask to squares in to_mask, as a list."""
+        return self._generate(from_mask, to_mask, to_mask)
+
+    def generate_legal_captures(self) -> List[chess.Move]:
+        """Legal captures, en passant included, and with every promotion piece for capturing promotions."""
+        return self._generate(chess.BB_ALL, self.occupied_co[not self.turn], chess.BB_ALL)
+
+    def generate_legal_quiets(self) -> List[chess.Move]:
+        """Legal moves to empty squares, en passant excluded; castling and quiet promotions included."""
+        return self._generate(chess.BB_ALL, ~self.occupied & chess.BB_ALL, 0)
+
+    def _generate(self, from_mask: chess.Bitboard, to_mask: chess.Bitboard, ep_mask: chess.Bitboard) -> List[chess.Move]:
+        turn = self.turn
+        pieces = self.pieces
+        us = self.occupied_co[turn]
+        occupied = self.occupied
+        king = (pieces[KING] & us).bit_length() - 1
+        checkers = self.attackers(not turn, king, occupied)
+        moves = []
+        append = moves.append
+
+        if from_mask & BB_SQUARES[king]:
+            moves_from_king = MOVES[king]
+            # The king doesn't shield a square behind it from a slider checking it
+            without_king = occupied & ~BB_SQUARES[king]
+            targets = KING_ATTACKS[king] & ~us & to_mask
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                if not self.attackers(not turn, to_square, without_king):
+                    append(moves_from_king[to_square])
+            if not checkers:
+                self._generate_castling(king, to_mask, append)
+
+        if checkers & (checkers - 1):
+            return moves  # Double check: only the king can move
+        if checkers:
+            # Capture the checker or block its line
+            to_mask &= BETWEEN[king][checkers.bit_length() - 1] | checkers
+
+        # Pieces pinned to the king may only move along the line of the pin
+        them = self.occupied_co[not turn]
+        queens = pieces[QUEEN]
+        snipers = ((RANK_ATTACKS[king][0] | FILE_ATTACKS[king][0]) & (pieces[ROOK] | queens)
+                   | DIAG_ATTACKS[king][0] & (pieces[BISHOP] | queens)) & them
+        pinned = 0
+        while snipers:
+            sniper = snipers.bit_length() - 1
+            snipers ^= BB_SQUARES[sniper]
+            blockers = BETWEEN[king][sniper] & occupied
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers & us
+        pinned_rays = RAYS[king]
+        targets_mask = ~us & to_mask
+
+        pieces_from = us & from_mask & ~pieces[PAWN] & ~pieces[KING]
+        while pieces_from:
+            from_square = pieces_from.bit_length() - 1
+            from_bb = BB_SQUARES[from_square]
+            pieces_from ^= from_bb
+            piece = self.squares[from_square]
+            if piece == KNIGHT:
+                if pinned & from_bb:
+                    continue  # A pinned knight can never stay on the line
+                targets = KNIGHT_ATTACKS[from_square]
+            else:
+                targets = 0
+                if piece != ROOK:
+                    targets |= DIAG_ATTACKS[from_square][DIAG_MASKS[from_square] & occupied]
+                if piece != BISHOP:
+                    targets |= (RANK_ATTACKS[from_square][RANK_MASKS[from_square] & occupied]
+                                | FILE_ATTACKS[from_square][FILE_MASKS[from_square] & occupied])
+                if pinned & from_bb:
+                    targets &= pinned_rays[from_square]
+            targets &= targets_mask
+            moves_from = MOVES[from_square]
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                append(moves_from[to_square])
+
+        pawns = pieces[PAWN] & us & from_mask
+        if pawns:
+            self._generate_pawn_moves(pawns, pinned, pinned_rays, them, occupied, to_mask, append)
+            if self.ep_square is not None and BB_SQUARES[self.ep_square] & ep_mask:
+                self._generate_en_passant(pawns, king, append)
+        return moves
+
+    def _generate_pawn_moves(self, pawns, pinned, pinned_rays, them, occupied, to_mask, append):
+        turn = self.turn
+        if turn == chess.WHITE:
+            single = (pawns << 8) & ~occupied
+            double = ((single & chess.BB_RANK_3) << 8) & ~occupied
+            step = 8
+        else:
+            single = (pawns >> 8) & ~occupied
+            double = ((single & chess.BB_RANK_6) >> 8) & ~occupied
+            step = -8
+
+        targets = single & to_mask
+        while targets:
+            to_square = targets.bit_length() - 1
+            targets ^= BB_SQUARES[to_square]
+            from_square = to_square - step
+            if pinned & BB_SQUARES[from_square] and not pinned_rays[from_square] & BB_SQUARES[to_square]:
+                continue
+            self._append_pawn_move(from_square, to_square, append)
+        targets = double & to_mask
+        while targets:
+            to_square = targets.bit_length() - 1
+            targets ^= BB_SQUARES[to_square]
+            from_square = to_square - 2 * step
+            if pinned & BB_SQUARES[from_square] and not pinned_rays[from_square] & BB_SQUARES[to_square]:
+                continue
+            append(MOVES[from_square][to_square])
+
+        capture_mask = them & to_mask
+        pawn_attacks = PAWN_ATTACKS[turn]
+        while pawns:
+            from_square = pawns.bit_length() - 1
+            from_bb = BB_SQUARES[from_square]
+            pawns ^= from_bb
+            targets = pawn_attacks[from_square] & capture_mask
+            if pinned & from_bb:
+                targets &= pinned_rays[from_square]
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                self._append_pawn_move(from_square, to_square, append)
+
+    @staticmethod
+    def _append_pawn_move(from_square, to_square, append):
+        if BB_SQUARES[to_square] & chess.BB_BACKRANKS:
+            for promotion in PROMOTION_TYPES:
+                append(chess.Move(from_square, to_square, promotion))
+        else:
+            append(MOVES[from_square][to_square])
+
+    def _generate_en_passant(self, pawns, king, append):
+        # Checked by removing both pawns, which also catches the capture exposing the king along the rank
+        ep_square = self.ep_square
+        captured_bb = BB_SQUARES[ep_square - 8 if self.turn else ep_square + 8]
+        capturers = PAWN_ATTACKS[not self.turn][ep_square] & pawns
+        while capturers:
+            from_square = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[from_square]
+            occupied = (self.occupied & ~BB_SQUARES[from_square] & ~captured_bb) | BB_SQUARES[ep_square]
+            if not self.attackers(not self.turn, king, occupied):
+                append(MOVES[from_square][ep_square])
+
+    def _generate_castling(self, king, to_mask, append):
+        turn = self.turn
+        rooks = self.castling_rights & self.pieces[ROOK] & self.occupied_co[turn] & \
+            (chess.BB_RANK_1 if turn == chess.WHITE else chess.BB_RANK_8)
+        if not rooks or king != (chess.E1 if turn == chess.WHITE else chess.E8):
+            return
+        occupied = self.occupied
+        for rook, to_square, passed in ((king + 3, king + 2, king + 1), (king - 4, king - 2, king - 1)):
+            if (rooks & BB_SQUARES[rook] and to_mask & BB_SQUARES[to_square] and not BETWEEN[king][rook] & occupied
+                    and not self.attackers(not turn, passed, occupied)
+                    and not self.attackers(not turn, to_square, occupied)):
+                append(MOVES[king][to_square])
+
+    def push(self, move: chess.Move):
+        """Make a move, or pass with a null move, in place; pop() takes it back."""
+        squares, pieces, occupied_co = self.squares, self.pieces, self.occupied_co
+        turn, ep_square = self.turn, self.ep_square
+        from_square, to_square = move.from_square, move.to_square
+        captured = squares[to_square] if move else 0
+        self._undo.append((captured, self.castling_rights, ep_square, self.halfmove_clock, self.key, self.score))
+        self.move_stack.append(move)
+        key = self.key ^ TURN_KEY
+        if ep_square is not None:
+            key ^= EP_KEYS[ep_square & 7]
+        self.turn = them = not turn
+        self.ep_square = None
+        if not move:
+            self.halfmove_clock += 1
+            self.key = key
+            return
+
+        scores = self.piece_square_scores
+        our_scores, our_keys, their_keys = scores[turn], PIECE_KEYS[turn], PIECE_KEYS[them]
+        piece = squares[from_square]
+        from_bb, to_bb = BB_SQUARES[from_square], BB_SQUARES[to_square]
+        score = self.score - our_scores[piece][from_square]
+        key ^= our_keys[piece][from_square]
+        pieces[piece] ^= from_bb
+        occupied_co[turn] ^= from_bb | to_bb
+        squares[from_square] = 0
+        if captured:
+            pieces[captured] ^= to_bb
+            occupied_co[them] ^= to_bb
+            score -= scores[them][captured][to_square]
+            key ^= their_keys[captured][to_square]
+        elif piece == PAWN and to_square == ep_square:
+            captured_square = to_square - 8 if turn else to_square + 8
+            captured_bb = BB_SQUARES[captured_square]
+            pieces[PAWN] ^= captured_bb
+            occupied_co[them] ^= captured_bb
+            squares[captured_square] = 0
+            score -= scores[them][PAWN][captured_square]
+            key ^= their_keys[PAWN][captured_square]
+        elif piece == KING and to_square - from_square in (2, -2):
+            rook_from, rook_to = (to_square + 1, to_square - 1) if to_square > from_square else (to_square - 2,
+                                                                                                to_square + 1)
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            pieces[ROOK] ^= rook_bb
+            occupied_co[turn] ^= rook_bb
+            squares[rook_from] = 0
+            squares[rook_to] = ROOK
+            score += our_scores[ROOK][rook_to] - our_scores[ROOK][rook_from]
+            key ^= our_keys[ROOK][rook_from] ^ our_keys[ROOK][rook_to]
+        placed = move.promotion or piece
+        pieces[placed] |= to_bb
+        squares[to_square] = placed
+        score += our_scores[placed][to_square]
+        key ^= our_keys[placed][to_square]
+        self.occupied = occupied_co[0] | occupied_co[1]
+        self.halfmove_clock = 0 if captured or piece == PAWN else self.halfmove_clock + 1
+
+        castling_rights = self.castling_rights
+        if castling_rights:
+            remaining = castling_rights & ~(from_bb | to_bb)
+            if piece == KING:
+                remaining &= ~(chess.BB_RANK_1 if turn == chess.WHITE else chess.BB_RANK_8)
+            if remaining != castling_rights:
+                key ^= castling_key(castling_rights) ^ castling_key(remaining)
+                self.castling_rights = remaining
+        if piece == PAWN and to_square - from_square in (16, -16):
+            ep_square = (from_square + to_square) >> 1
+            if PAWN_ATTACKS[turn][ep_square] & pieces[PAWN] & occupied_co[them]:
+                self.ep_square = ep_square
+                key ^= EP_KEYS[ep_square & 7]
+        self.key = key
+        self.score = score
+
+    def pop(self) -> chess.Move:
+        """Unmake the last move from its undo record, returning it."""
+        move = self.move_stack.pop()
+        captured, self.castling_rights, ep_square, self.halfmove_clock, self.key, self.score = self._undo.pop()
+        self.ep_square = ep_square
+        self.turn = turn = not self.turn
+        if not move:
+            return move
+
+        squares, pieces, occupied_co = self.squares, self.pieces, self.occupied_co
+        from_square, to_square = move.from_square, move.to_square
+        from_bb, to_bb = BB_SQUARES[from_square], BB_SQUARES[to_square]
+        placed = squares[to_square]
+        piece = PAWN if move.promotion else placed
+        pieces[placed] ^= to_bb
+        pieces[piece] |= from_bb
+        occupied_co[turn] ^= from_bb | to_bb
+        squares[from_square] = piece
+        squares[to_square] = captured
+        if captured:
+            pieces[captured] |= to_bb
+            occupied_co[not turn] |= to_bb
+        elif piece == PAWN and to_square == ep_square:
+            captured_square = to_square - 8 if turn else to_square + 8
+            captured_bb = BB_SQUARES[captured_square]
+            pieces[PAWN] |= captured_bb
+            occupied_co[not turn] |= captured_bb
+            squares[captured_square] = PAWN
+        elif piece == KING and to_square - from_square in (2, -2):
+            rook_from, rook_to = (to_square + 1, to_square - 1) if to_square > from_square else (to_square - 2,
+                                                                                                to_square + 1)
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            pieces[ROOK] ^= rook_bb
+            occupied_co[turn] ^= rook_bb
+            squares[rook_to] = 0
+            squares[rook_from] = ROOK
+        self.occupied = occupied_co[0] | occupied_co[1]
+        return move
@@ -0,0 +1,84 @@
+import json
+from typing import List, NamedTuple, Optional
+
+import chess
+
+
+class IterationStats(NamedTuple):
+    depth: int
+    score: float
+    nodes: int  # Nodes searched by this iteration alone
+    time: float  # Seconds spent on this iteration alone
+    pv: List[str]
+
+
+class SearchStats:
+    """Counters collected by one search while ChessAI.collect_stats is on."""
+
+    __slots__ = ('nodes', 'qnodes', 'beta_cutoffs', 'first_move_cutoffs', 'tt_probes', 'tt_hits', 'extensions',
+                 'iterations')
+
+    def __init__(self):
+        self.nodes = 0
+        self.qnodes = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.extensions = 0  # Moves searched a ply deeper by a search extension
+        self.iterations: List[IterationStats] = []
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Fraction of beta cutoffs caused by the first move searched, a measure of move ordering."""
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        """Fraction of transposition table probes that found an entry."""
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def branching_factor(self) -> float:
+        """Effective branching factor: nodes of the last iteration over those of the one before."""
+        if len(self.iterations) < 2 or not self.iterations[-2].nodes:
+            return 0.0
+        return self.iterations[-1].nodes / self.iterations[-2].nodes
+
+    def to_dict(self) -> dict:
+        """JSON-ready counters including the derived rates."""
+        return {
+            'nodes': self.nodes, 'qnodes': self.qnodes,
+            'beta_cutoffs': self.beta_cutoffs, 'first_move_cutoff_rate': round(self.first_move_cutoff_rate, 4),
+            'branching_factor': round(self.branching_factor, 3),
+            'tt_probes': self.tt_probes, 'tt_hits': self.tt_hits, 'tt_hit_rate': round(self.tt_hit_rate, 4),
+            'extensions': self.extensions,
+            'iterations': [iteration._asdict() for iteration in self.iterations],
+        }
+
+
+class SearchResult(NamedTuple):
+    """Outcome of ChessAI.get_best_move; stats is None unless statistics were collected."""
+    move: Optional[chess.Move]
+    depth: int
+    score: float
+    pv: List[chess.Move]
+    nodes: int
+    time: float
+    book: bool = False
+    stats: Optional[SearchStats] = None
+
+    def to_dict(self) -> dict:
+        """JSON-ready result with moves in UCI notation."""
+        return {
+            'move': self.move.uci() if self.move else None, 'depth': self.depth, 'score': self.score,
+            'pv': [move.uci() for move in self.pv], 'nodes': self.nodes, 'time': round(self.time, 6),
+            'book': self.book, 'stats': self.stats.to_dict() if self.stats else None,
+        }
+
+
+def append_jsonl(path: str, board: chess.Board, result: SearchResult):
+    """Append one searched move to a JSON-lines log."""
+    record = {'fen': board.fen(), 'ply': board.ply(), **result.to_dict()}
+    with open(path, 'a') as log:
+        log.write(json.dumps(record) + '\n')
@@ -0,0 +1,193 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional
+
+from tournament import OPENINGS, EngineConfig, Tournament, _play_pairing, load_openings, pairing
+
+
+def expected_score(elo: float) -> float:
+    """Expected score of the side that is `elo` points stronger."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def log_likelihood_ratio(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """Log-likelihood ratio of H1 (gain elo1) over H0 (gain elo0) for a W/D/L record.
+
+    Uses the normal approximation to the trinomial game outcome, which is what
+    sequential testing frameworks use once a few dozen games are in.
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if not variance:
+        return 0.0  # Every game had the same result, so there is no variance estimate yet
+    score0, score1 = expected_score(elo0), expected_score(elo1)
+    return (score1 - score0) * (2 * score - score0 - score1) * games / (2 * variance)
+
+
+class SPRT(Tournament):
+    """Sequential probability ratio test of a candidate (engine A) against a baseline (engine B).
+
+    Games are played in batches of `workers` until the log-likelihood ratio crosses a bound:
+    the upper one accepts H1 (the candidate gains elo1), the lower one accepts H0 (it gains
+    no more than elo0). The record is saved after every game so an interrupted test resumes,
+    replaying only the rounds that had not finished.
+    """
+
+    def __init__(self, candidate: EngineConfig, baseline: EngineConfig, elo0: float = 0.0, elo1: float = 10.0,
+                 alpha: float = 0.05, beta: float = 0.05, max_games: int = 20000,
+                 openings: Optional[List[str]] = None, workers: int = 1, max_plies: int = 300,
+                 state_path: Optional[str] = None):
+        super().__init__(candidate, baseline, max_games, openings, workers, max_plies)
+        self.elo0, self.elo1 = elo0, elo1
+        self.alpha, self.beta = alpha, beta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.state_path = state_path
+        self.next_round = 0  # Every round before this one has finished
+        self.finished_rounds = set()  # Rounds past next_round that finished early on another worker
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    @property
+    def llr(self) -> float:
+        """Log-likelihood ratio of the record so far."""
+        return log_likelihood_ratio(self.wins, self.draws, self.losses, self.elo0, self.elo1)
+
+    def decision(self) -> Optional[str]:
+        """'H1' if the candidate passed, 'H0' if it failed, None while undecided."""
+        if self.llr >= self.upper:
+            return 'H1'
+        if self.llr <= self.lower:
+            return 'H0'
+        return None
+
+    def summary(self) -> str:
+        """Running record with the Elo estimate and the LLR against its bounds."""
+        return f"{super().summary()}  LLR {self.llr:+.2f} ({self.lower:+.2f}, {self.upper:+.2f})"
+
+    def _state(self) -> dict:
+        return {
+            'candidate': self.engine_a._asdict(), 'baseline': self.engine_b._asdict(),
+            'elo0': self.elo0, 'elo1': self.elo1, 'alpha': self.alpha, 'beta': self.beta,
+            'wins': self.wins, 'draws': self.draws, 'losses': self.losses, 'next_round': self.next_round,
+            'finished_rounds': sorted(self.finished_rounds),
+        }
+
+    def save(self):
+        """Write the record to the state file atomically."""
+        temporary = self.state_path + '.tmp'
+        with open(temporary, 'w') as state_file:
+            json.dump(self._state(), state_file, indent=2)
+        os.replace(temporary, self.state_path)
+
+    def load(self):
+        """Resume the record from the state file, which must be for the same test."""
+        with open(self.state_path) as state_file:
+            state = json.load(state_file)
+        expected = self._state()
+        for key in ('candidate', 'baseline', 'elo0', 'elo1', 'alpha', 'beta'):
+            if state[key] != expected[key]:
+                raise ValueError(f"{self.state_path} is for a different test: {key} was {state[key]!r}")
+        self.wins, self.draws, self.losses = state['wins'], state['draws'], state['losses']
+        self.next_round = state['next_round']
+        self.finished_rounds = set(state.get('finished_rounds', []))
+
+    def unplayed_rounds(self) -> Iterator[int]:
+        """Rounds still to play, in order, skipping those that already finished."""
+        round_number = self.next_round
+        while True:
+            if round_number not in self.finished_rounds:
+                yield round_number
+            round_number += 1
+
+    def finish_round(self, round_number: int):
+        """Mark a round finished, advancing next_round past every finished round in sequence."""
+        self.finished_rounds.add(round_number)
+        while self.next_round in self.finished_rounds:
+            self.finished_rounds.remove(self.next_round)
+            self.next_round += 1
+
+    def run(self, pgn_path: Optional[str] = None, verbose: bool = True) -> Optional[str]:
+        """Play until a hypothesis is accepted or max_games is reached, returning the decision."""
+        pgn = open(pgn_path, 'a') if pgn_path else None
+        pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        rounds = self.unplayed_rounds()
+        running = {}
+        try:
+            while True:
+                played = self.wins + self.draws + self.losses
+                while self.decision() is None and len(running) < self.workers and played + len(running) < self.games:
+                    round_number = next(rounds)
+                    opening, candidate_is_white = pairing(round_number, self.openings)
+                    white, black = ((self.engine_a, self.engine_b) if candidate_is_white
+                                    else (self.engine_b, self.engine_a))
+                    future = pool.submit(_play_pairing, round_number + 1, white, black, opening, self.max_plies)
+                    running[future] = (round_number, candidate_is_white)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result, text = future.result()
+                    round_number, candidate_is_white = running.pop(future)
+                    self.record(result, candidate_is_white)
+                    self.finish_round(round_number)
+                    if pgn is not None:
+                        pgn.write(text + '\n\n')
+                        pgn.flush()
+                    if self.state_path:
+                        self.save()
+                    if verbose:
+                        print(self.summary(), flush=True)
+                if self.decision() is not None:
+                    break
+        finally:
+            if pgn is not None:
+                pgn.close()
+            # Games still running are not counted, so stop them rather than wait for them to finish.
+            # ProcessPoolExecutor has no public way to stop busy workers before Python 3.14.
+            workers = list((pool._processes or {}).values()) if running else []
+            pool.shutdown(wait=not running, cancel_futures=True)
+            for process in workers:
+                process.terminate()
+                process.join()
+        return self.decision()
+
+
+def main():
+    """Run an SPRT of a candidate configuration against a baseline."""
+    parser = argparse.ArgumentParser(description="SPRT gauntlet of a candidate ChessAI against a baseline")
+    parser.add_argument('--candidate', default='', help="candidate options, e.g. 'max_depth=4,time_limit=0.2'")
+    parser.add_argument('--baseline', default='', help="baseline options")
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=10.0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--max-games', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--openings', help="file of opening lines in UCI moves, one per line")
+    parser.add_argument('--max-plies', type=int, default=300)
+    parser.add_argument('--state', default='sprt_state.json', help="record saved after every game and resumed from")
+    parser.add_argument('--pgn', default='sprt.pgn')
+    args = parser.parse_args()
+
+    test = SPRT(EngineConfig.parse('candidate', args.candidate), EngineConfig.parse('baseline', args.baseline),
+                args.elo0, args.elo1, args.alpha, args.beta, args.max_games,
+                load_openings(args.openings) if args.openings else OPENINGS, args.workers, args.max_plies, args.state)
+    decision = test.run(args.pgn)
+    if decision == 'H1':
+        print(f"H1 accepted: the candidate gains at least {args.elo1} Elo")
+    elif decision == 'H0':
+        print(f"H0 accepted: the candidate gains no more than {args.elo0} Elo")
+    else:
+        print("Inconclusive: reached the game limit")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,33 @@
+import json
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 import chess
 import pygame
 from two_player_game import ChessGame, GameState, CoordinateConverter, Colors, Config, ChessRenderer
-from play_as_white_vs_ai import ChessAI
+from engine import ChessAI
+from position import Position
+import play_as_white_vs_ai
+import chess.polyglot
+from move_ordering import MoveOrderer
+from opening_book import OpeningBook
+import perft
+import bench
+import bitbases
+import lazy_smp
+import sprt
+import tournament
+import uci
+try:
+    import batch_eval
+except ImportError:  # NumPy is only needed for batch evaluation
+    batch_eval = None
+from transposition_table import Bound, TranspositionTable
 
 
 class TestChessGame(unittest.TestCase):
@@ -56,7 +81,9 @@ class TestChessGame(unittest.TestCase):
         board = chess.Board()
         board.remove_piece_at(chess.E7)  # Remove black pawn
         score_with_advantage = ai.evaluate_position(board)
-        self.assertLess(score_with_advantage, 0)  # White should be better
+        self.assertGreater(score_with_advantage, 0)  # White, to move, should be better
+        board.turn = chess.BLACK
+        self.assertEqual(ai.evaluate_position(board), -score_with_advantage)  # Scores are for the side to move
 
     def test_game_state_initialization(self):
         """Test initial game state properties."""
@@ -96,5 +123,760 @@ class TestChessGame(unittest.TestCase):
         pygame.quit()
 
 
+class TestIterativeDeepening(unittest.TestCase):
+    def test_time_budget_is_respected(self):
+        """Test that the search stops near its time budget and still returns a legal move."""
+        ai = ChessAI(tt_size_mb=1)
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b KQkq - 0 1")
+        start = time.perf_counter()
+        move = ai.get_best_move(board, time_limit=0.3)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn(move, board.legal_moves)
+        self.assertEqual(len(board.move_stack), 0)  # Aborted iterations leave the board untouched
+
+    def test_depth_cap(self):
+        """Test that the search keeps the last completed iteration's principal variation."""
+        ai = ChessAI(tt_size_mb=1, max_depth=2)
+        board = chess.Board()
+        board.push_san("e4")
+        move = ai.get_best_move(board, time_limit=60)
+        self.assertEqual(ai._pv[0], move)
+        self.assertLessEqual(len(ai._pv), 2)
+
+
+class TestPrincipalVariationSearch(unittest.TestCase):
+    def test_same_scores_with_fewer_nodes(self):
+        """Test that PVS with aspiration windows finds the full-window scores while searching fewer nodes."""
+        nodes = {}
+        for enabled in (True, False):
+            scores, nodes[enabled] = [], 0
+            for fen in bench.BENCH_POSITIONS[::5]:
+                ai = ChessAI(tt_size_mb=1, max_depth=4)
+                ai.pvs = ai.aspiration = enabled
+                ai.null_move = ai.lmr = ai.futility = ai.razoring = False  # Exact scores need no pruning
+                ai.extensions = False
+                scores.append(ai.search(chess.Board(fen), float('inf'))[2])
+                nodes[enabled] += ai.nodes
+            if enabled:
+                expected = scores
+        self.assertEqual(scores, expected)
+        self.assertLess(nodes[True], nodes[False])
+
+
+class TestSelectiveSearch(unittest.TestCase):
+    def search(self, fen: str, depth: int, selective: bool) -> ChessAI:
+        ai = ChessAI(tt_size_mb=1, max_depth=depth)
+        ai.null_move = ai.lmr = ai.futility = ai.razoring = selective
+        ai.search(chess.Board(fen), float('inf'))
+        return ai
+
+    def test_pruning_saves_nodes_and_keeps_tactics(self):
+        """Test that selective search cuts the tree and still finds a back-rank mate."""
+        fen = "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"
+        self.assertLess(self.search(fen, 4, True).nodes, self.search(fen, 4, False).nodes)
+        ai = self.search("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", 4, True)
+        self.assertEqual(ai.principal_variation[0], chess.Move.from_uci("d1d8"))
+
+    def test_no_null_move_in_pawn_endings(self):
+        """Test that null-move pruning is never tried with only kings and pawns on the board."""
+        null_moves = []
+        ai = ChessAI(tt_size_mb=1, max_depth=6)
+        push_null = ai._push_null
+        ai._push_null = lambda board: null_moves.append(board.fen()) or push_null(board)
+        ai.search(chess.Board("8/8/1p1k4/1P6/2PK4/8/8/8 w - - 0 1"), float('inf'))
+        self.assertEqual(null_moves, [])
+        ai.max_depth = 5
+        ai.search(chess.Board("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10"),
+                  float('inf'))
+        self.assertNotEqual(null_moves, [])
+
+
+class TestSearchExtensions(unittest.TestCase):
+    def test_extensions_find_mate_at_lower_depth(self):
+        """Test that extending the checks finds a mate in two that the same depth misses without them."""
+        board = chess.Board("r1b2k1r/ppp1bppp/8/1B1Q4/5q2/2P5/PPP2PPP/R3R1K1 w - - 1 1")
+        scores = {}
+        for extensions in (True, False):
+            ai = ChessAI(tt_size_mb=1, max_depth=4, collect_stats=True)
+            ai.extensions = extensions
+            ai.get_best_move(board, float('inf'))
+            scores[extensions] = ai.last_result.score
+            self.assertEqual(ai.last_result.stats.extensions > 0, extensions)
+            if extensions:
+                self.assertEqual(ai.last_result.move, chess.Move.from_uci("d5d8"))
+        self.assertEqual(scores[True], ChessAI.MATE - 3)
+        self.assertLess(scores[False], ChessAI.MATE_BOUND)
+
+
+class TestTerminalNodes(unittest.TestCase):
+    def test_mate_scores_count_plies(self):
+        """Test that a mate in one scores MATE - 1 however deep the search goes on."""
+        ai = ChessAI(tt_size_mb=1, max_depth=5)
+        move, _, score = ai.search(chess.Board("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"), float('inf'))
+        self.assertEqual(move, chess.Move.from_uci("d1d8"))
+        self.assertEqual(score, ChessAI.MATE - 1)
+        self.assertEqual(uci.UCIEngine.format_score(score), "mate 1")
+        self.assertEqual(uci.UCIEngine.format_score(2 - ChessAI.MATE), "mate -1")
+        self.assertEqual(uci.UCIEngine.format_score(ChessAI.BITBASE_WIN - 9), "cp 18991")
+
+    def test_repetition_of_a_game_position_is_a_draw(self):
+        """Test that positions from the game before the root count towards repetitions."""
+        board = chess.Board()
+        for san in ["Nf3", "Nf6", "Ng1", "Ng8", "Nf3", "Nf6", "Ng1"]:
+            board.push_san(san)
+        ai = ChessAI(tt_size_mb=1, max_depth=1)
+        ai.search(board, float('inf'))
+        position = Position(board, ai.piece_square_scores)
+        ai._push(position, board.parse_san("Ng8"))
+        self.assertTrue(ai._is_draw(position))
+        ai._pop(position)
+        ai._push(position, board.parse_san("Nc6"))
+        self.assertFalse(ai._is_draw(position))
+
+    def test_fifty_move_rule_and_bare_material_are_draws(self):
+        """Test the cheap draw checks against python-chess."""
+        ai = ChessAI(tt_size_mb=1)
+        for fen, draw in [("8/8/8/4k3/8/8/3B1K2/8 w - - 0 1", True), ("8/8/8/4k3/8/8/4RK2/8 w - - 100 80", True),
+                          ("8/8/8/4k3/8/8/4RK2/8 w - - 99 80", False)]:
+            board = chess.Board(fen)
+            ai._keys = [chess.polyglot.zobrist_hash(board)]
+            self.assertEqual(ai._is_draw(Position(board, ai.piece_square_scores)), draw)
+            self.assertEqual(draw, board.is_insufficient_material() or board.is_fifty_moves())
+
+    def test_mate_on_the_hundredth_half_move_is_not_a_draw(self):
+        """Test that checkmate takes priority over the fifty-move rule."""
+        board = chess.Board("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 99 80")
+        ai = ChessAI(tt_size_mb=1, max_depth=3)
+        self.assertEqual(ai.get_best_move(board, time_limit=60), chess.Move.from_uci("d1d8"))
+        board.push_uci("d1d8")
+        self.assertEqual(board.outcome().termination, chess.Termination.CHECKMATE)
+        ai._keys = [chess.polyglot.zobrist_hash(board)]
+        self.assertFalse(ai._is_draw(Position(board, ai.piece_square_scores)))
+
+
+class TestQuiescenceSearch(unittest.TestCase):
+    def test_defended_pawn_is_not_grabbed(self):
+        """Test that a one-ply search sees the recapture behind a queen capture."""
+        ai = ChessAI(tt_size_mb=1, max_depth=1)
+        board = chess.Board("3qk3/8/8/8/3P4/4P3/8/4K3 b - - 0 1")
+        self.assertNotEqual(ai.get_best_move(board, time_limit=60), chess.Move.from_uci("d8d4"))
+
+    def test_hanging_piece_is_taken(self):
+        """Test that an undefended piece is still captured."""
+        ai = ChessAI(tt_size_mb=1, max_depth=1)
+        board = chess.Board("3qk3/8/8/8/3N4/8/8/4K3 b - - 0 1")
+        self.assertEqual(ai.get_best_move(board, time_limit=60), chess.Move.from_uci("d8d4"))
+
+
+class TestIncrementalEvaluation(unittest.TestCase):
+    def test_search_keeps_incremental_score_in_step(self):
+        """Test that debug mode finds no drift through castling, en passant and promotion lines."""
+        ai = ChessAI(tt_size_mb=1, max_depth=3, debug=True)
+        for fen in ["r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b KQkq - 0 1",
+                    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b - - 0 1",
+                    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1"]:
+            board = chess.Board(fen)
+            ai.get_best_move(board, time_limit=60)
+            self.assertEqual(board.fen(), fen)
+
+    def test_incremental_score_matches_full_evaluation(self):
+        """Test that the running score and key equal a full recompute along a game."""
+        ai = ChessAI(tt_size_mb=1)
+        board = chess.Board()
+        position = Position(board, ai.piece_square_scores)
+        ai._keys = [position.key]
+        for san in ["e4", "d5", "exd5", "Qxd5", "Nc3", "Qa5", "d4", "c6", "Nf3", "Bf5", "Bc4", "e6", "O-O"]:
+            move = board.parse_san(san)
+            board.push(move)
+            ai._push(position, move)
+            self.assertEqual(position.score, ai.material_score(board))
+            self.assertEqual(ai._keys[-1], chess.polyglot.zobrist_hash(board))
+
+
+class TestSearchStatistics(unittest.TestCase):
+    def test_stats_collected_and_logged(self):
+        """Test that statistics are collected into the result and each move is appended to the log."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stats.jsonl')
+            ai = ChessAI(tt_size_mb=1, max_depth=3, stats_log=path)
+            board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+            move = ai.get_best_move(board, time_limit=60)
+            result = ai.last_result
+            self.assertEqual((result.move, result.depth), (move, 3))
+            stats = result.stats
+            self.assertEqual(stats.nodes, result.nodes)
+            self.assertGreater(stats.qnodes, 0)
+            self.assertLessEqual(stats.qnodes, stats.nodes)
+            self.assertLessEqual(stats.tt_hits, stats.tt_probes)
+            self.assertTrue(0 < stats.first_move_cutoff_rate <= 1)
+            self.assertEqual([iteration.depth for iteration in stats.iterations], [1, 2, 3])
+            self.assertEqual(sum(iteration.nodes for iteration in stats.iterations), stats.nodes)
+            self.assertGreater(stats.branching_factor, 1)
+
+            board.push(move)
+            ai.get_best_move(board, time_limit=60)
+            with open(path) as log:
+                records = [json.loads(line) for line in log]
+            self.assertEqual(len(records), 2)
+            self.assertEqual(records[0]['move'], move.uci())
+            self.assertEqual(records[1]['ply'], board.ply())
+
+    def test_no_stats_by_default(self):
+        """Test that statistics are off unless asked for, with the basic result still recorded."""
+        ai = ChessAI(tt_size_mb=1, max_depth=2)
+        move = ai.get_best_move(chess.Board(), time_limit=60)
+        self.assertIsNone(ai.last_result.stats)
+        self.assertEqual(ai.last_result.move, move)
+
+
+class TestMoveOrdering(unittest.TestCase):
+    def test_ordering_categories(self):
+        """Test hash move, then MVV-LVA captures, then promotions, then killers, then history."""
+        board = chess.Board("4k3/1P6/8/3q4/2P4r/5N2/8/4K3 w - - 0 1")
+        orderer = MoveOrderer()
+        orderer.record_cutoff(board, chess.Move.from_uci("f3g5"), 2, 3)
+        orderer.record_cutoff(board, chess.Move.from_uci("e1e2"), 0, 4)
+        moves = orderer.order(board, list(board.legal_moves), 2, (chess.Move.from_uci("e1f2"),))
+        self.assertEqual([move.uci() for move in moves[:9]],
+                         ["e1f2", "c4d5", "f3h4", "b7b8q", "b7b8r", "b7b8b", "b7b8n", "f3g5", "e1e2"])
+
+    def test_staged_generation(self):
+        """Test that staged moves match the full ordering and quiets aren't generated before they're needed."""
+        board = chess.Board("4k3/1P6/8/3q4/2P4r/5N2/8/4K3 w - - 0 1")
+        orderer = MoveOrderer()
+        orderer.record_cutoff(board, chess.Move.from_uci("f3g5"), 2, 3)
+        orderer.record_cutoff(board, chess.Move.from_uci("e1e2"), 0, 4)
+        hash_moves = (chess.Move.from_uci("e1f2"), chess.Move.from_uci("a1a2"))  # The second one is illegal
+        expected = orderer.order(board, list(board.legal_moves), 2, hash_moves[:1])
+        position = Position(board, ChessAI(tt_size_mb=1).piece_square_scores)
+        with mock.patch.object(Position, 'generate_legal_quiets', wraps=position.generate_legal_quiets) as quiets:
+            staged = orderer.staged(position, 2, hash_moves)
+            self.assertEqual([next(staged) for _ in range(8)], expected[:8])
+            quiets.assert_not_called()
+            rest = list(staged)
+            quiets.assert_called_once()
+        self.assertEqual(rest[0], expected[8])  # Quiets tied on history may come in another order
+        self.assertEqual(sorted(rest, key=str), sorted(expected[8:], key=str))
+
+
+class TestBackgroundSearch(unittest.TestCase):
+    def setUp(self):
+        self.game_state = play_as_white_vs_ai.GameState()
+        self.game_state.ai = ChessAI(tt_size_mb=1, time_limit=0.2)
+
+    def tearDown(self):
+        self.game_state.cancel_ai_move()
+
+    def wait_for_ai_move(self):
+        deadline = time.perf_counter() + 5
+        while self.game_state.thinking and time.perf_counter() < deadline:
+            self.game_state.poll_ai_move()
+            time.sleep(0.01)
+
+    def test_ai_move_is_played_after_polling(self):
+        """Test that the AI searches in the background and its move is picked up by polling."""
+        self.game_state.board.push_san("e4")
+        self.game_state.start_ai_move()
+        self.assertTrue(self.game_state.thinking)
+        self.assertEqual(len(self.game_state.board.move_stack), 1)  # The board is not touched while thinking
+        self.wait_for_ai_move()
+        self.assertFalse(self.game_state.thinking)
+        self.assertEqual(len(self.game_state.board.move_stack), 2)
+
+    def test_cancel_discards_search(self):
+        """Test that a new game stops the search promptly and drops its move."""
+        self.game_state.ai.time_limit = 30
+        self.game_state.board.push_san("e4")
+        self.game_state.start_ai_move()
+        start = time.perf_counter()
+        self.game_state.new_game()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertFalse(self.game_state.thinking)
+        self.game_state.poll_ai_move()
+        self.assertEqual(len(self.game_state.board.move_stack), 0)
+
+    def test_ponder_hit_and_miss(self):
+        """Test that the AI ponders on its expected reply and counts hits and misses."""
+        self.game_state.board.push_san("e4")
+        self.game_state.start_ai_move()
+        self.wait_for_ai_move()
+        ponder_move = self.game_state._ponder_move
+        self.assertIsNotNone(ponder_move)
+        self.assertFalse(self.game_state.thinking)  # Pondering happens on the player's time
+
+        self.game_state.board.push(ponder_move)
+        self.game_state.start_ai_move()
+        self.wait_for_ai_move()
+        self.assertEqual(len(self.game_state.board.move_stack), 4)
+
+        wrong_reply = next(move for move in self.game_state.board.legal_moves
+                           if move != self.game_state._ponder_move)
+        self.game_state.board.push(wrong_reply)
+        self.game_state.start_ai_move()
+        self.wait_for_ai_move()
+        self.assertEqual(len(self.game_state.board.move_stack), 6)
+        self.assertEqual((self.game_state.ponder_hits, self.game_state.ponder_misses), (1, 1))
+        self.assertEqual(self.game_state.ponder_hit_rate, 0.5)
+
+    def test_only_played_moves_are_logged(self):
+        """Test that ponder searches are not logged, so the log has one record per AI move played."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stats.jsonl')
+            self.game_state.ai = ChessAI(tt_size_mb=1, time_limit=0.2, stats_log=path)
+            board = self.game_state.board
+            fens = []
+            for player_move in ("e4", None):
+                if player_move is None:  # Answer with anything but the move the AI is pondering on
+                    player_move = board.san(next(move for move in board.legal_moves
+                                                 if move != self.game_state._ponder_move))
+                board.push_san(player_move)
+                fens.append(board.fen())
+                self.game_state.start_ai_move()
+                self.wait_for_ai_move()
+            self.game_state.cancel_ai_move()
+            self.assertEqual(self.game_state.ponder_misses, 1)
+            with open(path) as log:
+                self.assertEqual([json.loads(line)['fen'] for line in log], fens)
+
+    def test_game_ending_move_stops_pondering(self):
+        """Test that a player's move that ends the game stops the ponder search and counts as a miss."""
+        self.game_state.board = chess.Board("1k6/8/1K6/8/8/8/8/6QR w - - 0 1")
+        self.game_state._start_search(self.game_state.board.copy(), float('inf'),
+                                      ponder_move=chess.Move.from_uci("h1h2"))
+        thread = self.game_state._ai_thread
+        self.game_state.handle_click(chess.G1)
+        self.game_state.handle_click(chess.G8)
+        self.assertTrue(self.game_state.board.is_checkmate())
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.game_state._ai_thread)
+        self.assertEqual((self.game_state.ponder_hits, self.game_state.ponder_misses), (0, 1))
+
+
+@unittest.skipIf(batch_eval is None, "NumPy is not installed")
+class TestBatchEvaluation(unittest.TestCase):
+    def test_batch_scores_match_evaluate_position(self):
+        """Test that vectorized scores equal evaluate_position, including checkmate, across chunks."""
+        ai = ChessAI(tt_size_mb=1)
+        fens = [chess.STARTING_FEN,
+                "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+                "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1"]
+        scores = batch_eval.evaluate_batch(fens, ai, chunk_size=2)
+        self.assertEqual(scores.tolist(), [ai.evaluate_position(chess.Board(fen)) for fen in fens])
+
+    def test_streaming_chunks(self):
+        """Test that the iterator yields bounded chunks."""
+        ai = ChessAI(tt_size_mb=1)
+        chunks = list(batch_eval.iter_evaluate((chess.Board() for _ in range(10)), ai, chunk_size=4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self):
+        """Write a small Polyglot book: e4/d4 from the start, and castling for White after 1.e4 e5 2.Nf3 Nc6 3.Bc4 Bc5."""
+        self.castling_board = chess.Board("r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        records = [
+            (chess.polyglot.zobrist_hash(chess.Board()), chess.E2, chess.E4, 10),
+            (chess.polyglot.zobrist_hash(chess.Board()), chess.D2, chess.D4, 30),
+            (chess.polyglot.zobrist_hash(self.castling_board), chess.E1, chess.H1, 5),
+        ]
+        handle, self.path = tempfile.mkstemp(suffix='.bin')
+        with os.fdopen(handle, 'wb') as book_file:
+            for key, from_square, to_square, weight in sorted(records):
+                book_file.write(struct.pack('>QHHI', key, (from_square << 6) | to_square, weight, 0))
+        self.book = OpeningBook(self.path)
+
+    def tearDown(self):
+        self.book.close()
+        os.remove(self.path)
+
+    def test_lookup_and_selection(self):
+        """Test binary-searched lookup, best-move selection and castling decoding."""
+        self.assertEqual({entry.move.uci() for entry in self.book.entries(chess.Board())}, {"e2e4", "d2d4"})
+        self.assertEqual(self.book.choose(chess.Board(), weighted=False), chess.Move.from_uci("d2d4"))
+        self.assertEqual(self.book.choose(self.castling_board), chess.Move.from_uci("e1g1"))
+        self.assertIsNone(self.book.choose(chess.Board("4k3/8/8/8/8/8/8/4K3 w - - 0 1")))
+
+    def test_ai_plays_book_moves_within_book_depth(self):
+        """Test that the AI uses the book only up to its configured depth."""
+        ai = ChessAI(tt_size_mb=1, max_depth=1, book_path=self.path, book_weighted=False)
+        self.assertEqual(ai.get_best_move(chess.Board()), chess.Move.from_uci("d2d4"))
+        self.assertEqual(ai.nodes, 0)
+        ai.book_depth = 0
+        ai.get_best_move(chess.Board())
+        self.assertGreater(ai.nodes, 0)
+        ai.close()
+
+
+class TestBitbases(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Generate the KQK table once, the quickest of the three to solve."""
+        cls.directory = tempfile.mkdtemp()
+        with open(os.path.join(cls.directory, "KQK.bin"), 'wb') as table_file:
+            table_file.write(bitbases.generate(chess.QUEEN))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(os.path.join(cls.directory, "KQK.bin"))
+        os.rmdir(cls.directory)
+
+    def setUp(self):
+        self.tables = bitbases.Bitbases(self.directory)
+
+    def tearDown(self):
+        self.tables.close()
+
+    def test_probe_results(self):
+        """Test win, loss, draw and mate distances, with either colour holding the queen."""
+        self.assertEqual(self.tables.probe(chess.Board("7k/8/6K1/8/8/8/8/1Q6 w - - 0 1")), (1, 1))
+        self.assertEqual(self.tables.probe(chess.Board("1q6/8/8/8/8/6k1/8/7K b - - 0 1")), (1, 1))
+        self.assertEqual(self.tables.probe(chess.Board("Q6k/8/6K1/8/8/8/8/8 b - - 0 1")), (-1, 0))
+        self.assertEqual(self.tables.probe(chess.Board("7k/6Q1/8/8/8/8/8/K7 b - - 0 1")), (0, 0))  # Kxg7
+        self.assertIsNone(self.tables.probe(chess.Board("7k/8/6K1/8/8/8/8/1R6 w - - 0 1")))
+
+    def test_search_converts_with_shortest_mate(self):
+        """Test that the AI plays moves that keep shortening the distance to mate."""
+        ai = ChessAI(tt_size_mb=1, max_depth=1, bitbase_dir=self.directory)
+        board = chess.Board("8/8/8/3k4/8/8/q7/4K3 b - - 0 1")  # The AI plays Black in this mode
+        _, plies = self.tables.probe(board)
+        move = ai.get_best_move(board, time_limit=60)
+        board.push(move)
+        self.assertEqual(self.tables.probe(board), (-1, plies - 1))
+        ai.close()
+
+
+class TestUCI(unittest.TestCase):
+    def setUp(self):
+        self.lines = []
+        self.engine = uci.UCIEngine(output=self.lines.append)
+        self.engine.handle("setoption name Hash value 1")
+
+    def tearDown(self):
+        self.engine.close()
+
+    def bestmove(self) -> chess.Move:
+        self.engine.wait()
+        return chess.Move.from_uci(self.lines[-1].split()[1])
+
+    def test_handshake_and_options(self):
+        """Test the uci/isready handshake and that options are applied."""
+        self.engine.handle("uci")
+        self.assertEqual(self.lines[-1], "uciok")
+        self.assertTrue(any(line.startswith("option name Threads") for line in self.lines))
+        self.engine.handle("setoption name MoveTime value 150")
+        self.engine.handle("isready")
+        self.assertEqual(self.lines[-1], "readyok")
+        self.assertEqual(self.engine.move_time, 150)
+        self.assertEqual(self.engine.ai.tt.size_mb, 1)
+
+    def test_finds_mate_for_either_side(self):
+        """Test that the engine plays for whichever side is to move."""
+        self.engine.handle("position fen 6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1")
+        self.engine.handle("go depth 2")
+        self.assertEqual(self.bestmove(), chess.Move.from_uci("a1a8"))
+        self.assertTrue(self.lines[-2].startswith("info depth 2 score mate 1 "))
+
+        self.engine.handle("position fen r5k1/8/8/8/8/8/5PPP/6K1 b - - 0 1")
+        self.engine.handle("go depth 2")
+        self.assertEqual(self.bestmove(), chess.Move.from_uci("a8a1"))
+        self.assertTrue(self.lines[-2].startswith("info depth 2 score mate 1 "))
+
+    def test_info_reports_hashfull(self):
+        """Test that iteration info reports the table's fill in permille, growing as the search deepens."""
+        self.engine.handle("position startpos moves e2e4 e7e5")
+        self.engine.handle("go depth 5")
+        self.engine.wait()
+        hashfull = [int(line.split()[line.split().index("hashfull") + 1]) for line in self.lines
+                    if line.startswith("info depth")]
+        self.assertEqual(hashfull, sorted(hashfull))
+        self.assertTrue(0 < hashfull[-1] <= 1000)
+
+    def test_position_moves_and_stop(self):
+        """Test that stop ends an infinite search promptly with a legal move."""
+        self.engine.handle("position startpos moves e2e4 e7e5")
+        self.engine.handle("go infinite")
+        time.sleep(0.2)
+        start = time.perf_counter()
+        self.engine.handle("stop")
+        self.assertLess(time.perf_counter() - start, 1.0)
+        board = chess.Board()
+        board.push_san("e4")
+        board.push_san("e5")
+        self.assertIn(self.bestmove(), board.legal_moves)
+
+    def test_infinite_search_waits_for_stop(self):
+        """Test that `go infinite` sends no bestmove until `stop`, even once the search has finished."""
+        self.engine.handle("position fen 8/8/8/4k3/8/8/8/4K3 w - - 0 1")
+        self.engine.handle("go infinite")
+        time.sleep(0.3)
+        self.assertFalse(any(line.startswith("bestmove") for line in self.lines))
+        self.engine.handle("stop")
+        self.assertTrue(self.lines[-1].startswith("bestmove"))
+
+    def test_bad_commands_are_ignored(self):
+        """Test that malformed `go`, `position` and `setoption` commands leave the engine running."""
+        self.engine.handle("position startpos moves e2e4")
+        for line in ["go depth", "go wtime abc", "position startpos moves e2e5", "position fen not a fen",
+                     "position startpos moves e2e4 zz99", "setoption name Hash value", "setoption name Hash"]:
+            self.assertTrue(self.engine.handle(line), line)
+        self.assertEqual(self.engine.board.move_stack, [chess.Move.from_uci("e2e4")])
+        self.assertFalse(any(line.startswith("bestmove") for line in self.lines))
+        self.engine.handle("go depth 1")
+        self.assertIn(self.bestmove(), self.engine.board.legal_moves)
+
+
+class TestBench(unittest.TestCase):
+    def test_signature_is_deterministic(self):
+        """Test that the bench report is JSON-serializable and its node signature repeats exactly."""
+        positions = bench.BENCH_POSITIONS[::25]
+        report = bench.bench(positions, depth=2, tt_size_mb=1)
+        self.assertEqual(report['positions'], len(positions))
+        self.assertEqual(report['signature'], sum(result['nodes'] for result in report['results']))
+        self.assertEqual([entry['depth'] for entry in report['results'][0]['time_to_depth']], [1, 2])
+        json.dumps(report)
+        self.assertEqual(bench.bench(positions, depth=2, tt_size_mb=1)['signature'], report['signature'])
+
+    def test_positions_are_legal(self):
+        """Test that every bench position is valid and still has moves to search."""
+        self.assertGreaterEqual(len(bench.BENCH_POSITIONS), 50)
+        for fen in bench.BENCH_POSITIONS:
+            board = chess.Board(fen)
+            self.assertTrue(board.is_valid(), fen)
+            self.assertFalse(board.is_game_over(), fen)
+
+
+class TestPerft(unittest.TestCase):
+    def test_suite_counts(self):
+        """Test move generation against the published perft counts."""
+        for position in perft.PERFT_SUITE:
+            for depth in (1, 2, 3):
+                self.assertEqual(perft.perft(chess.Board(position.fen), depth), position.counts[depth], position.name)
+
+    def test_divide_and_engine_make_unmake(self):
+        """Test that divide and the engine's incremental make/unmake agree with the plain count."""
+        position = perft.PERFT_SUITE[1]
+        board = chess.Board(position.fen)
+        counts = perft.divide(board, 2, engine=True)
+        self.assertEqual(len(counts), position.counts[1])
+        self.assertEqual(sum(counts.values()), position.counts[2])
+        self.assertEqual(board.fen(), position.fen)
+
+    def test_parallel_divide(self):
+        """Test that splitting the root across processes gives the same counts."""
+        board = chess.Board(perft.PERFT_SUITE[3].fen)
+        self.assertEqual(perft.parallel_divide(board, 3, workers=2), perft.divide(board, 3))
+
+
+class TestPosition(unittest.TestCase):
+    def test_perft_suite(self):
+        """Test the search position's move generation and make/unmake against the published counts."""
+        for position in perft.PERFT_SUITE:
+            self.assertEqual(sum(perft.divide(chess.Board(position.fen), 3, engine=True).values()),
+                             position.counts[3], position.name)
+
+    def test_matches_python_chess_along_random_games(self):
+        """Test moves, checks, keys and undo against python-chess through random games."""
+        rng = random.Random(1)
+        ai = ChessAI(tt_size_mb=1)
+        for fen in [position.fen for position in perft.PERFT_SUITE]:
+            board = chess.Board(fen)
+            position = Position(board, ai.piece_square_scores)
+            start_fen = position.fen()
+            for _ in range(60):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                self.assertEqual(set(position.generate_legal_moves()), set(moves), board.fen())
+                self.assertEqual(set(position.generate_legal_captures()), set(board.generate_legal_captures()))
+                self.assertEqual(position.is_check(), board.is_check())
+                for move in moves:
+                    self.assertEqual(position.gives_check(move), board.gives_check(move), (board.fen(), move))
+                move = rng.choice(moves)
+                board.push(move)
+                position.push(move)
+                self.assertEqual(position.key, chess.polyglot.zobrist_hash(board))
+                self.assertEqual(position.score, ai.material_score(board))
+            while position.move_stack:
+                position.pop()
+            self.assertEqual(position.fen(), start_fen)
+
+    def test_incremental_key_matches_polyglot(self):
+        """Test that keys updated by push and restored by pop match a full Zobrist hash."""
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        position = Position(board, ChessAI().piece_square_scores)
+        keys = [position.key]
+        # Castling both ways, a double push allowing en passant, the capture and a promotion
+        for uci in ["e1g1", "e8c8", "a2a4", "b4a3", "f3f6", "a3b2", "f6e7", "b2a1q"]:
+            position.push(chess.Move.from_uci(uci))
+            board.push_uci(uci)
+            self.assertEqual(position.key, chess.polyglot.zobrist_hash(board))
+            keys.append(position.key)
+        for key in reversed(keys[:-1]):
+            position.pop()
+            self.assertEqual(position.key, key)
+
+
+class TestStaticExchange(unittest.TestCase):
+    # (FEN, move, material the side to move gains with best play of the exchange)
+    SEE_POSITIONS = [
+        ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 100),  # Undefended pawn
+        ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -220),  # Both sides' x-rays
+        ("4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1", "d1d5", -800),  # Queen takes a pawn defended by a pawn
+        ("4k3/8/2p5/3p4/4P3/8/8/4K3 w - - 0 1", "e4d5", 0),  # Even pawn trade
+        ("4R3/2r3p1/5bk1/1p1r3p/p2PR1P1/P1BK1P2/1P6/8 b - - 0 1", "h5g4", 0),
+        ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 100),  # En passant
+        ("3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", 100),  # The rook behind backs up the capture
+        ("1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8q", 1120),  # Capturing promotion
+        ("1nk5/P7/8/8/8/8/8/4K3 w - - 0 1", "a7b8q", 220),  # The new queen is taken back
+        ("k7/8/8/8/8/2p5/3p4/3K4 w - - 0 1", "d1d2", -19900),  # The king can't take a defended pawn
+    ]
+
+    def test_known_positions(self):
+        """Test static exchange evaluation against worked-out exchanges."""
+        scores = ChessAI(tt_size_mb=1).piece_square_scores
+        for fen, uci, expected in self.SEE_POSITIONS:
+            position = Position(chess.Board(fen), scores)
+            move = chess.Move.from_uci(uci)
+            self.assertEqual(position.see(move), expected, fen)
+            self.assertEqual(position.is_losing_capture(move), expected < 0, fen)
+
+    def test_results_cached_by_position(self):
+        """Test that an exchange is worked out once per position and move."""
+        board = chess.Board(self.SEE_POSITIONS[1][0])
+        position = Position(board, ChessAI(tt_size_mb=1).piece_square_scores)
+        move = chess.Move.from_uci("d3e5")
+        with mock.patch.object(Position, 'attackers', wraps=position.attackers) as attackers:
+            position.see(move)
+            calls = attackers.call_count
+            position.push(chess.Move.from_uci("e2e3"))
+            position.pop()
+            self.assertEqual(position.see(move), -220)
+            self.assertEqual(attackers.call_count, calls)
+
+
+class TestTournament(unittest.TestCase):
+    def test_elo_difference(self):
+        """Test the Elo estimate and that its error bars shrink with more games."""
+        self.assertEqual(tournament.elo_difference(5, 10, 5)[0], 0)
+        elo, margin = tournament.elo_difference(30, 40, 10)
+        self.assertAlmostEqual(elo, 88.7, places=1)
+        self.assertLess(tournament.elo_difference(300, 400, 100)[1], margin)
+        self.assertAlmostEqual(tournament.elo_difference(10, 40, 30)[0], -elo)
+
+    def test_play_game_records_result(self):
+        """Test that a self-play game ends with a legal PGN and is scored from engine A's side."""
+        engine_a = tournament.EngineConfig.parse('A', 'tt_size_mb=1,max_depth=1,time_limit=0.05')
+        engine_b = tournament.EngineConfig.parse('B', 'tt_size_mb=1,max_depth=1,time_limit=0.05')
+        game = tournament.play_game(engine_a, engine_b, tournament.OPENINGS[0], max_plies=20)
+        self.assertIn(game.headers['Result'], tournament.RESULT_SCORES)
+        self.assertEqual(game.end().board().ply(), 20)
+        self.assertEqual(game.headers['White'], "A (tt_size_mb=1,max_depth=1,time_limit=0.05)")
+
+        match = tournament.Tournament(engine_a, engine_b, games=2)
+        match.record('1-0', a_is_white=False)
+        match.record('1/2-1/2', a_is_white=True)
+        self.assertEqual((match.wins, match.draws, match.losses), (0, 1, 1))
+
+
+class TestSPRT(unittest.TestCase):
+    def setUp(self):
+        self.candidate = tournament.EngineConfig.parse('candidate', 'max_depth=3')
+        self.baseline = tournament.EngineConfig.parse('baseline', 'max_depth=2')
+
+    def test_log_likelihood_ratio_decides(self):
+        """Test that a lopsided record accepts H1, its mirror accepts H0 and an even one stays open."""
+        test = sprt.SPRT(self.candidate, self.baseline, elo0=0, elo1=20)
+        test.wins, test.draws, test.losses = 600, 300, 400
+        self.assertEqual(test.decision(), 'H1')
+        test.wins, test.losses = 400, 600
+        self.assertEqual(test.decision(), 'H0')
+        test.wins, test.draws, test.losses = 20, 20, 20
+        self.assertIsNone(test.decision())
+        self.assertEqual(sprt.log_likelihood_ratio(0, 5, 0, 0, 20), 0.0)
+
+    def test_resume_from_state(self):
+        """Test that the record is saved and resumed, and that a different test's state is refused."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state.json')
+            test = sprt.SPRT(self.candidate, self.baseline, state_path=path)
+            test.wins, test.draws, test.losses, test.next_round = 3, 4, 2, 10
+            test.save()
+            resumed = sprt.SPRT(self.candidate, self.baseline, state_path=path)
+            self.assertEqual((resumed.wins, resumed.draws, resumed.losses, resumed.next_round), (3, 4, 2, 10))
+            with self.assertRaises(ValueError):
+                sprt.SPRT(self.candidate, self.baseline, elo1=5, state_path=path)
+
+    def test_resume_replays_unfinished_rounds(self):
+        """Test that rounds finished out of order are saved, and only unfinished rounds are played on resume."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state.json')
+            test = sprt.SPRT(self.candidate, self.baseline, state_path=path)
+            for round_number in (0, 2, 4):  # Rounds 1 and 3 were still running when the test stopped
+                test.finish_round(round_number)
+            test.save()
+            resumed = sprt.SPRT(self.candidate, self.baseline, state_path=path)
+            self.assertEqual((resumed.next_round, resumed.finished_rounds), (1, {2, 4}))
+            rounds = resumed.unplayed_rounds()
+            self.assertEqual([next(rounds) for _ in range(3)], [1, 3, 5])
+            resumed.finish_round(1)
+            self.assertEqual((resumed.next_round, resumed.finished_rounds), (3, {4}))
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_store_and_probe(self):
+        """Test that entries round-trip and shallower results don't overwrite deeper ones."""
+        table = TranspositionTable(1)
+        move = chess.Move.from_uci("e7e8q")
+        table.store(12345, 4, -150, Bound.LOWER, move)
+        table.store(12345, 2, 80, Bound.UPPER, None)
+        entry = table.probe(12345)
+        self.assertEqual((entry.depth, entry.score, entry.bound, entry.move), (4, -150, Bound.LOWER, move))
+        self.assertIsNone(table.probe(54321))
+
+    def test_shared_table_is_visible_to_attached_tables(self):
+        """Test that a table attached by name reads entries written through the creating table."""
+        table = TranspositionTable(1, shared=True)
+        attached = TranspositionTable.attach(table.shared_name, 1)
+        table.store(777, 3, 42, Bound.EXACT, chess.Move.from_uci("g1f3"))
+        self.assertEqual(attached.probe(777).score, 42)
+        attached.close()
+        table.close()
+
+    def test_lazy_smp_search(self):
+        """Test that a multi-process search returns a legal move and shuts down cleanly."""
+        ai = ChessAI(tt_size_mb=1, max_depth=3, threads=2)
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 2 3")
+        try:
+            move = ai.get_best_move(board, time_limit=60)
+            self.assertIn(move, board.legal_moves)
+            self.assertEqual(ai.principal_variation[0], move)
+            self.assertEqual(ai.last_result.pv[0], move)
+        finally:
+            ai.close()
+
+    def test_helpers_take_the_main_search_settings(self):
+        """Test that a helper search uses the main AI's current flags and depth and returns its own PV."""
+        ai = ChessAI(tt_size_mb=1, max_depth=2)
+        ai.lmr = ai.extensions = False
+        helper = ChessAI(tt_size_mb=1)
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 2 3")
+        with mock.patch.multiple(lazy_smp, _helper_ai=helper, _helper_stop=threading.Event()):
+            move, depth, _, pv = lazy_smp._helper_search(board, float('inf'), 1, helper.tt.age,
+                                                         lazy_smp.search_options(ai))
+        self.assertEqual((helper.max_depth, helper.lmr, helper.extensions, helper.null_move), (2, False, False, True))
+        self.assertEqual(depth, 2)
+        self.assertEqual(pv[0], move)
+
+    def test_table_persists_between_moves(self):
+        """Test that the AI keeps its table between searches."""
+        ai = ChessAI(tt_size_mb=1, max_depth=2)
+        board = chess.Board()
+        board.push_san("e4")
+        ai.get_best_move(board)
+        self.assertIsNotNone(ai.tt.probe(chess.polyglot.zobrist_hash(board)))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,223 @@
+import argparse
+import ast
+import inspect
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import chess
+import chess.pgn
+
+from engine import ChessAI
+
+
+# Short, roughly balanced opening lines; each is played twice with the colours swapped
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6",
+    "e2e4 c7c5 g1f3 d7d6",
+    "e2e4 c7c5 b1c3 b8c6",
+    "e2e4 e7e6 d2d4 d7d5",
+    "e2e4 c7c6 d2d4 d7d5",
+    "e2e4 d7d5 e4d5 d8d5",
+    "e2e4 g8f6 e4e5 f6d5",
+    "e2e4 d7d6 d2d4 g8f6",
+    "d2d4 d7d5 c2c4 e7e6",
+    "d2d4 d7d5 c2c4 c7c6",
+    "d2d4 g8f6 c2c4 g7g6",
+    "d2d4 g8f6 c2c4 e7e6",
+    "d2d4 f7f5 g2g3 g8f6",
+    "d2d4 d7d5 g1f3 g8f6",
+    "c2c4 e7e5 b1c3 g8f6",
+    "c2c4 c7c5 g1f3 b8c6",
+    "g1f3 d7d5 g2g3 g8f6",
+    "g1f3 g8f6 c2c4 b7b6",
+    "b2b3 e7e5 c1b2 b8c6",
+    "e2e4 e7e5 f2f4 e5f4",
+]
+
+RESULT_SCORES = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}
+
+
+class EngineConfig(NamedTuple):
+    """A named ChessAI setup: constructor arguments plus attributes set on the instance."""
+    name: str
+    options: Dict[str, object]
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> 'EngineConfig':
+        """Parse 'key=value,key=value', e.g. 'max_depth=4,time_limit=0.2'."""
+        options = {}
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            key, _, value = item.partition('=')
+            try:
+                options[key.strip()] = ast.literal_eval(value.strip())
+            except (ValueError, SyntaxError):
+                options[key.strip()] = value.strip()
+        return cls(name, options)
+
+    def create(self) -> ChessAI:
+        """Build the ChessAI, passing what the constructor accepts and setting the rest as feature flags."""
+        accepted = inspect.signature(ChessAI.__init__).parameters
+        ai = ChessAI(**{key: value for key, value in self.options.items() if key in accepted})
+        for key, value in self.options.items():
+            if key not in accepted:
+                if not hasattr(ai, key):
+                    raise ValueError(f"ChessAI has no option {key!r}")
+                setattr(ai, key, value)
+        return ai
+
+    def __str__(self) -> str:
+        options = ','.join(f"{key}={value}" for key, value in self.options.items())
+        return f"{self.name} ({options})" if options else self.name
+
+
+def play_game(white: EngineConfig, black: EngineConfig, opening: str, max_plies: int = 300) -> chess.pgn.Game:
+    """Play one game from the opening moves and return it with a Result header."""
+    engines = {chess.WHITE: white.create(), chess.BLACK: black.create()}
+    board = chess.Board()
+    try:
+        for uci in opening.split():
+            board.push_uci(uci)
+        while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+            move = engines[board.turn].get_best_move(board.copy())
+            if move is None or move not in board.legal_moves:
+                break  # Forfeit, scored below from the side that failed to move
+            board.push(move)
+    finally:
+        for ai in engines.values():
+            ai.close()
+
+    if board.is_game_over(claim_draw=True):
+        result = board.result(claim_draw=True)
+    elif board.ply() >= max_plies:
+        result = '1/2-1/2'  # Adjudicated as a draw at the move limit
+    else:
+        result = '0-1' if board.turn == chess.WHITE else '1-0'
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers['White'] = str(white)
+    game.headers['Black'] = str(black)
+    game.headers['Result'] = result
+    game.headers['Opening'] = opening
+    return game
+
+
+def _play_pairing(round_number: int, white: EngineConfig, black: EngineConfig, opening: str,
+                  max_plies: int) -> Tuple[str, str]:
+    """Play one scheduled game in a worker, returning (result, PGN text)."""
+    game = play_game(white, black, opening, max_plies)
+    game.headers['Event'] = 'Chess-Bot self-play'
+    game.headers['Round'] = str(round_number)
+    game.headers['Date'] = time.strftime('%Y.%m.%d')
+    return game.headers['Result'], str(game)
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> Tuple[float, float]:
+    """Elo difference implied by a W/D/L record with its 95% confidence margin."""
+    games = wins + draws + losses
+    if not games:
+        return 0.0, float('inf')
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(fraction: float) -> float:
+        fraction = min(max(fraction, 1e-6), 1 - 1e-6)
+        return 400 * math.log10(fraction / (1 - fraction))
+
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+def pairing(index: int, openings: List[str]) -> Tuple[str, bool]:
+    """(opening, engine A plays White) for game `index`, each opening played with both colours."""
+    return openings[(index // 2) % len(openings)], index % 2 == 0
+
+
+def schedule(games: int, openings: List[str]) -> List[Tuple[str, bool]]:
+    """The pairing of every game in a match."""
+    return [pairing(index, openings) for index in range(games)]
+
+
+class Tournament:
+    """Plays engine A against engine B across a process pool, recording W/D/L from A's side."""
+
+    def __init__(self, engine_a: EngineConfig, engine_b: EngineConfig, games: int,
+                 openings: Optional[List[str]] = None, workers: int = 1, max_plies: int = 300):
+        self.engine_a = engine_a
+        self.engine_b = engine_b
+        self.games = games
+        self.openings = openings or OPENINGS
+        self.workers = workers
+        self.max_plies = max_plies
+        self.wins = self.draws = self.losses = 0
+
+    def record(self, result: str, a_is_white: bool):
+        """Count a finished game from engine A's point of view."""
+        score = RESULT_SCORES[result] if a_is_white else 1 - RESULT_SCORES[result]
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def summary(self) -> str:
+        """Running W/D/L and Elo difference of engine A over engine B."""
+        elo, margin = elo_difference(self.wins, self.draws, self.losses)
+        played = self.wins + self.draws + self.losses
+        return (f"Games {played}/{self.games}  {self.engine_a.name} vs {self.engine_b.name}: "
+                f"+{self.wins} ={self.draws} -{self.losses}  Elo {elo:+.1f} +/- {margin:.1f}")
+
+    def run(self, pgn_path: Optional[str] = None, verbose: bool = True) -> Tuple[int, int, int]:
+        """Play every game, appending each to the PGN file as it finishes, and return (W, D, L)."""
+        pairings = schedule(self.games, self.openings)
+        pgn = open(pgn_path, 'w') if pgn_path else None
+        try:
+            with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {}
+                for round_number, (opening, a_is_white) in enumerate(pairings, 1):
+                    white, black = (self.engine_a, self.engine_b) if a_is_white else (self.engine_b, self.engine_a)
+                    future = pool.submit(_play_pairing, round_number, white, black, opening, self.max_plies)
+                    futures[future] = a_is_white
+                for future in as_completed(futures):
+                    result, text = future.result()
+                    self.record(result, futures[future])
+                    if pgn is not None:
+                        pgn.write(text + '\n\n')
+                        pgn.flush()
+                    if verbose:
+                        print(self.summary(), flush=True)
+        finally:
+            if pgn is not None:
+                pgn.close()
+        return self.wins, self.draws, self.losses
+
+
+def load_openings(path: str) -> List[str]:
+    """Opening lines from a file, one line of space-separated UCI moves each."""
+    with open(path) as openings_file:
+        return [line.strip() for line in openings_file if line.strip() and not line.startswith('#')]
+
+
+def main():
+    """Run a self-play match between two engine configurations."""
+    parser = argparse.ArgumentParser(description="Headless self-play tournament between two ChessAI configurations")
+    parser.add_argument('--engine-a', default='', help="options for engine A, e.g. 'max_depth=4,time_limit=0.2'")
+    parser.add_argument('--engine-b', default='', help="options for engine B")
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--openings', help="file of opening lines in UCI moves, one per line")
+    parser.add_argument('--max-plies', type=int, default=300, help="adjudicate a draw after this many plies")
+    parser.add_argument('--pgn', default='tournament.pgn')
+    args = parser.parse_args()
+
+    tournament = Tournament(EngineConfig.parse('A', args.engine_a), EngineConfig.parse('B', args.engine_b),
+                            args.games, load_openings(args.openings) if args.openings else None,
+                            args.workers, args.max_plies)
+    tournament.run(args.pgn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import struct
+import chess
+from multiprocessing.shared_memory import SharedMemory
+from typing import NamedTuple, Optional
+
+
+class Bound:
+    """Static class describing how a stored score relates to the true score."""
+    EXACT = 0
+    LOWER = 1  # Search failed high, true score >= stored score
+    UPPER = 2  # Search failed low, true score <= stored score
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    score: int
+    bound: int
+    move: Optional[chess.Move]
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results, preallocated from a megabyte budget.
+
+    Entries live in a flat buffer in buckets of two slots. A slot holding the same
+    position is refreshed in place, otherwise entries left over from an earlier search
+    are evicted first and then the shallowest entry.
+
+    Each entry is two 64-bit words: the packed data and the key XORed with that data, so
+    a torn write from another process sharing the table reads back as a miss.
+    """
+
+    ENTRY = struct.Struct('<QQ')  # key ^ data, data = score | move << 32 | depth << 48 | flags << 56
+    BUCKET_SIZE = 2
+    AGE_LIMIT = 64
+
+    def __init__(self, size_mb: int = 16, shared: bool = False, _shm: Optional[SharedMemory] = None):
+        entry_count = max(self.BUCKET_SIZE, size_mb * 1024 * 1024 // self.ENTRY.size)
+        self.bucket_count = entry_count // self.BUCKET_SIZE
+        self.size_mb = size_mb
+        size = self.bucket_count * self.BUCKET_SIZE * self.ENTRY.size
+        self._owner = _shm is None
+        if _shm is None and shared:
+            _shm = SharedMemory(create=True, size=size)
+            _shm.buf[:size] = bytes(size)
+        self._shm = _shm
+        self.data = _shm.buf[:size] if _shm is not None else bytearray(size)
+        self.age = 0
+
+    @classmethod
+    def attach(cls, name: str, size_mb: int) -> 'TranspositionTable':
+        """Open a table created with shared=True in another process."""
+        return cls(size_mb, _shm=SharedMemory(name=name))
+
+    @property
+    def shared_name(self) -> Optional[str]:
+        """Name of the shared memory block backing the table, if any."""
+        return self._shm.name if self._shm is not None else None
+
+    def close(self):
+        """Release the shared memory block, removing it if this table created it."""
+        if self._shm is None:
+            return
+        self.data.release()
+        self.data = bytearray()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def new_search(self):
+        """Advance the table age so entries from earlier searches become replaceable."""
+        self.age = (self.age + 1) % self.AGE_LIMIT
+
+    def clear(self):
+        """Remove every stored entry."""
+        self.data[:] = bytes(len(self.data))
+        self.age = 0
+
+    def _bucket_offset(self, key: int) -> int:
+        return (key % self.bucket_count) * self.BUCKET_SIZE * self.ENTRY.size
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """Look up a position by its Zobrist key."""
+        offset = self._bucket_offset(key)
+        for _ in range(self.BUCKET_SIZE):
+            checked_key, data = self.ENTRY.unpack_from(self.data, offset)
+            if checked_key ^ data == key:
+                score = data & 0xFFFFFFFF
+                if score & 0x80000000:
+                    score -= 1 << 32
+                return TTEntry((data >> 48) & 0xFF, score, (data >> 56) & 3, decode_move((data >> 32) & 0xFFFF))
+            offset += self.ENTRY.size
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: Optional[chess.Move]):
+        """Store a search result using the depth/age replacement policy."""
+        offset = self._bucket_offset(key)
+        victim, victim_priority = offset, None
+        for _ in range(self.BUCKET_SIZE):
+            checked_key, data = self.ENTRY.unpack_from(self.data, offset)
+            stored_depth = (data >> 48) & 0xFF
+            current = data >> 58 == self.age
+            if checked_key ^ data == key:
+                if depth < stored_depth and bound != Bound.EXACT and current:
+                    return
+                if move is None:
+                    move = decode_move((data >> 32) & 0xFFFF)
+                victim = offset
+                break
+            # Stale entries sort before current ones, then shallower before deeper
+            priority = (current, stored_depth)
+            if victim_priority is None or priority < victim_priority:
+                victim, victim_priority = offset, priority
+            offset += self.ENTRY.size
+
+        data = ((int(score) & 0xFFFFFFFF) | (encode_move(move) << 32) | (min(max(depth, 0), 255) << 48)
+                | ((bound | (self.age << 2)) << 56))
+        self.ENTRY.pack_into(self.data, victim, key ^ data, data)
+
+    def usage(self, sample: int = 1000) -> float:
+        """Fraction of the first `sample` slots written during the current search."""
+        slots = min(sample, self.bucket_count * self.BUCKET_SIZE)
+        used = 0
+        for index in range(slots):
+            checked_key, data = self.ENTRY.unpack_from(self.data, index * self.ENTRY.size)
+            if checked_key and data >> 58 == self.age:
+                used += 1
+        return used / slots
+
+
+def encode_move(move: Optional[chess.Move]) -> int:
+    """Pack a move into 16 bits (from, to, promotion)."""
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(encoded: int) -> Optional[chess.Move]:
+    """Unpack a move produced by encode_move."""
+    if encoded == 0:
+        return None
+    return chess.Move(encoded & 63, (encoded >> 6) & 63, (encoded >> 12) or None)
@@ -0,0 +1,230 @@
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+import chess
+
+from engine import ChessAI
+
+
+class InputReader(threading.Thread):
+    """Reads lines from a stream on a daemon thread so the command loop never blocks on a search."""
+
+    def __init__(self, stream=None):
+        super().__init__(daemon=True)
+        self.stream = stream or sys.stdin
+        self.lines: queue.Queue = queue.Queue()
+
+    def run(self):
+        for line in self.stream:
+            self.lines.put(line)
+        self.lines.put(None)  # End of input is treated as quit
+
+    def readline(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Next input line, or None at end of input."""
+        return self.lines.get(timeout=timeout)
+
+
+class UCIEngine:
+    """Universal Chess Interface front-end around ChessAI.
+
+    Searches run on a worker thread, so `stop`, `isready` and `quit` are handled while a
+    search is in flight; `stop` sets the search's stop event and the worker answers with
+    the move from the last completed iteration.
+    """
+
+    NAME = 'Chess-Bot'
+    AUTHOR = 'JPBradburn'
+    HASH_RANGE = (1, 1024)
+    THREADS_RANGE = (1, 64)
+    MOVETIME_RANGE = (10, 600000)
+    BOOK_PATH = 'book.bin'
+    BITBASE_DIR = 'bitbases'
+    MOVES_TO_GO = 30  # Moves the remaining clock time is assumed to cover when the GUI doesn't say
+
+    def __init__(self, output: Optional[Callable[[str], None]] = None):
+        self.output = output or self._print
+        self.hash_mb = 16
+        self.threads = 1
+        self.move_time = 2000  # Milliseconds per move when `go` gives no time control
+        self.ai: Optional[ChessAI] = None
+        self.board = chess.Board()
+        self._search: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+
+    @staticmethod
+    def _print(line: str):
+        print(line, flush=True)
+
+    def _engine(self) -> ChessAI:
+        """The ChessAI, created on first use so option changes before `isready` cost nothing."""
+        if self.ai is None:
+            self.ai = ChessAI(tt_size_mb=self.hash_mb, threads=self.threads,
+                              book_path=self.BOOK_PATH, bitbase_dir=self.BITBASE_DIR)
+        return self.ai
+
+    def close(self):
+        """Stop any search and release the ChessAI, which is rebuilt on next use."""
+        self.stop()
+        if self.ai is not None:
+            self.ai.close()
+            self.ai = None
+
+    def handle(self, line: str) -> bool:
+        """Process one command line, returning False once the engine should quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.output(f"id name {self.NAME}")
+            self.output(f"id author {self.AUTHOR}")
+            self.output(f"option name Hash type spin default 16 min {self.HASH_RANGE[0]} max {self.HASH_RANGE[1]}")
+            self.output(f"option name Threads type spin default 1 "
+                        f"min {self.THREADS_RANGE[0]} max {self.THREADS_RANGE[1]}")
+            self.output(f"option name MoveTime type spin default 2000 "
+                        f"min {self.MOVETIME_RANGE[0]} max {self.MOVETIME_RANGE[1]}")
+            self.output("uciok")
+        elif command == 'isready':
+            self._engine()
+            self.output("readyok")
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'ucinewgame':
+            self.stop()
+            if self.ai is not None:
+                self.ai.tt.clear()
+            self.board = chess.Board()
+        elif command == 'position':
+            self.stop()
+            self.set_position(args)
+        elif command == 'go':
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.close()
+            return False
+        return True
+
+    def set_option(self, args: list):
+        """Handle `setoption name <name> value <value>`."""
+        if 'name' not in args or 'value' not in args:
+            return
+        name = ' '.join(args[args.index('name') + 1:args.index('value')]).lower()
+        try:
+            value = int(args[args.index('value') + 1])
+        except (IndexError, ValueError):
+            return
+        if name == 'hash':
+            self.hash_mb = min(max(value, self.HASH_RANGE[0]), self.HASH_RANGE[1])
+            self.close()
+        elif name == 'threads':
+            self.threads = min(max(value, self.THREADS_RANGE[0]), self.THREADS_RANGE[1])
+            self.close()
+        elif name == 'movetime':
+            self.move_time = min(max(value, self.MOVETIME_RANGE[0]), self.MOVETIME_RANGE[1])
+
+    def set_position(self, args: list):
+        """Handle `position [startpos | fen <fen>] [moves <move>...]`, ignoring it if the FEN or a move is bad."""
+        moves = args.index('moves') if 'moves' in args else len(args)
+        try:
+            board = chess.Board(' '.join(args[1:moves])) if args and args[0] == 'fen' else chess.Board()
+            for uci in args[moves + 1:]:
+                board.push_uci(uci)
+        except ValueError:
+            return
+        self.board = board
+
+    def time_budget(self, params: dict) -> float:
+        """Seconds to spend on this move from the `go` parameters."""
+        if 'movetime' in params:
+            return params['movetime'] / 1000
+        clock = params.get('wtime' if self.board.turn == chess.WHITE else 'btime')
+        if clock is None:
+            return self.move_time / 1000
+        increment = params.get('winc' if self.board.turn == chess.WHITE else 'binc', 0)
+        moves_to_go = params.get('movestogo', self.MOVES_TO_GO)
+        budget = clock / max(moves_to_go, 1) + increment * 0.8
+        return max(min(budget, clock * 0.5), 10) / 1000
+
+    def go(self, args: list):
+        """Handle `go`, starting a search on the worker thread. A `go` with a bad number is ignored."""
+        self.stop()
+        params = {}
+        for name, value in zip(args, args[1:] + ['']):
+            if name in ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'movetime', 'depth'):
+                try:
+                    params[name] = int(value)
+                except ValueError:
+                    return
+        infinite = 'infinite' in args
+
+        ai = self._engine()
+        ai.max_depth = params.get('depth', 64)
+        time_limit = float('inf') if infinite or 'depth' in params else self.time_budget(params)
+        self._stop = threading.Event()
+        self._search = threading.Thread(target=self._run_search, args=(ai, self.board.copy(), time_limit, self._stop, infinite),
+                                        daemon=True)
+        self._search.start()
+
+    @staticmethod
+    def format_score(score: float) -> str:
+        """UCI score: 'mate N' in moves for a mate the search found, otherwise centipawns."""
+        plies = ChessAI.MATE - abs(score)
+        if plies < ChessAI.MATE - ChessAI.BITBASE_WIN:
+            return f"mate {(int(plies) + 1) // 2 if score > 0 else -(int(plies) // 2)}"
+        return f"cp {int(score)}"
+
+    def _run_search(self, ai: ChessAI, board: chess.Board, time_limit: float, stop: threading.Event,
+                    infinite: bool = False):
+        start = time.perf_counter()
+
+        def report(depth: int, score: float, pv: list):
+            elapsed = time.perf_counter() - start
+            self.output(f"info depth {depth} score {self.format_score(score)} nodes {ai.nodes} "
+                        f"nps {int(ai.nodes / elapsed) if elapsed else 0} time {int(elapsed * 1000)} "
+                        f"hashfull {int(ai.tt.usage() * 1000)} "
+                        f"pv {' '.join(move.uci() for move in pv)}")
+
+        ai.on_iteration = report
+        try:
+            move = ai.get_best_move(board, time_limit, stop)
+        finally:
+            ai.on_iteration = None
+        if move is None:
+            move = next(iter(board.legal_moves), None)
+        if infinite:
+            stop.wait()  # UCI holds the bestmove of `go infinite` until `stop`, even once the search is done
+        self.output(f"bestmove {move.uci() if move else '0000'}")
+
+    def stop(self):
+        """Stop the running search, if any, and wait for its bestmove."""
+        if self._search is not None:
+            self._stop.set()
+            self._search.join()
+            self._search = None
+            self._stop = None
+
+    def wait(self):
+        """Block until the running search has reported its bestmove."""
+        if self._search is not None:
+            self._search.join()
+
+
+def main():
+    """Run the engine over stdin/stdout."""
+    engine = UCIEngine()
+    reader = InputReader()
+    reader.start()
+    while True:
+        line = reader.readline()
+        if line is None or not engine.handle(line):
+            break
+    engine.close()
+
+
+if __name__ == '__main__':
+    main()